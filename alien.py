@@ -1,8 +1,7 @@
-import pygame
 from pygame.sprite import Sprite
 
 class Alien(Sprite):
-    '''表示单个外星人的类'''
+    '''表示舰队编队中单个外星人的类'''
 
     def __init__(self, ai_game):
         '''初始化外星人并设置其起始位置'''
@@ -10,23 +9,11 @@ class Alien(Sprite):
         self.screen = ai_game.screen
         self.settings = ai_game.settings
 
-        # 加载外星人图像并设置其rect属性
-        self.image = pygame.image.load('images/alien.bmp')
-        self.rect = self.image.get_rect()
+        # 从共享资源缓存获取外星人图像
+        self.image = ai_game.assets.image('images/alien.bmp')
+        # 像素碰撞用的掩码，所有外星人共享
+        self.mask = ai_game.assets.mask('images/alien.bmp')
 
-        # 每个外星人最初都在屏幕的左上角附近
-        self.rect.x = self.rect.width
-        self.rect.y = self.rect.height
-
-        # 存储外星人的精确水平位置
-        self.x = float(self.rect.x)
-
-    def check_edges(self):
-        '''如果外星人位于屏幕边缘，就返回True'''
-        screen_rect = self.screen.get_rect()
-        return (self.rect.right >= screen_rect.right) or (self.rect.left <= 0)
-
-    def update(self):
-        '''向左或向右移动外星人'''
-        self.x += self.settings.alien_speed * self.settings.fleet_direction
-        self.rect.x = self.x
\ No newline at end of file
+        # 外星人在编队中的位置（相对于舰队原点），由舰队统一移动，自身不再逐个更新；
+        # 屏幕位置是slot加上舰队原点，因此外星人没有单独的rect
+        self.slot = self.image.get_rect()
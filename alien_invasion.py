@@ -1,5 +1,10 @@
+import argparse
+import os
+import random
 import sys
-from time import sleep
+import threading
+from math import ceil
+from time import perf_counter, sleep, strftime
 
 import pygame
 
@@ -8,106 +13,424 @@ from game_stats import GameStats
 from scoreboard import Scoreboard
 from button import Button
 from ship import Ship
-from bullet import Bullet
-from alien import Alien
+from bullet import BulletPool
+from fleet import create_fleet
+from governor import QualityGovernor
+from assets import AssetCache, to_display_format
+from audio import AudioManager
+from renderer import (DirtyRectTracker, FrameScaler, RenderBatch, bullet_commands,
+                      formation_commands, ship_command)
+from profiler import FrameProfiler
+from snapshot import SnapshotBuffer, take_snapshot
+from text import get_font, text_cache
+from replay import (ACTION_FIRE, ACTION_LEFT, ACTION_RIGHT, SessionRecorder,
+                    encode_actions)
 
 
-class AlienInvasion:
-    def __init__(self):
-        '''初始化游戏并创建游戏资源'''
-        pygame.init()
-        pygame.mixer.init()
+# 在屏幕中央显示提示的停顿状态
+BANNER_STATES = ('respawning', 'level_clear', 'game_over')
 
-        self.clock = pygame.time.Clock()
-        self.settings = Settings()
 
-        self.screen = pygame.display.set_mode(
-            (self.settings.screen_width, self.settings.screen_height)
-        )
-        pygame.display.set_caption('Alien Invasion')
+class AlienInvasion:
+    def __init__(self, headless=False, record_dir=None, audio=True,
+                 offscreen=False, surface=None, settings=None):
+        '''初始化游戏并创建游戏资源
+
+        headless为True时使用SDL的dummy视频驱动且不加载音频，不打开真实窗口，
+        可以通过step()以远超实时的速度推进游戏逻辑；
+        指定record_dir时，每局游戏的输入和状态哈希都会录制到该目录；
+        audio为False时完全不初始化混音器；
+        offscreen为True或给出surface时完全不创建显示窗口，画面渲染到surface
+        （默认新建一张与屏幕同尺寸的图像）上，同一进程内可以创建多个实例，其余同无头模式；
+        settings可以传入事先调整好的设置，如渲染比例和全屏
+        '''
+        start = perf_counter()
+        offscreen = offscreen or surface is not None
+        headless = headless or offscreen
+        audio = audio and not headless
+        self.headless = headless
+        self.offscreen = offscreen
+        self.record_dir = record_dir
+        self.recorder = None
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+            # 不让SDL接管SIGTERM/SIGINT，否则进程池结束工作进程时信号只会变成无人处理的退出事件
+            os.environ['SDL_NO_SIGNAL_HANDLERS'] = '1'
+
+        if audio:
+            pygame.init()
+        else:
+            if not offscreen:
+                pygame.display.init()
+            pygame.font.init()
 
-        self._load_sounds()
+        self.clock = pygame.time.Clock()
+        self.settings = settings if settings is not None else Settings()
+        self.profiler = FrameProfiler()
+        text_cache.on_miss = self.profiler.note_alloc
+        if headless:
+            self.settings.persist_high_scores = False
+        if offscreen:
+            # 离屏图像不需要提交到窗口，整屏填充比逐块擦除上一帧更快
+            self.settings.dirty_rendering = False
+
+        # screen_rect是模拟坐标系，与渲染分辨率和窗口大小无关；
+        # screen是渲染目标（内部帧缓冲），window是最终显示画面的图像
+        size = (self.settings.screen_width, self.settings.screen_height)
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self.render_scale = self.settings.render_scale
+        if offscreen:
+            self.window = surface
+        else:
+            if self.settings.fullscreen:
+                self.window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            else:
+                self.window = pygame.display.set_mode(size)
+            pygame.display.set_caption('Alien Invasion')
+        self.renderer = DirtyRectTracker(None, self.settings, display=not offscreen)
+        self._create_framebuffer()
+
+        # 资源只加载一次，并在set_mode之后转换为显示格式
+        self.assets = AssetCache()
+        # 音频在后台线程加载，菜单不必等待解码完成
+        self.audio = AudioManager(self, enabled=audio)
+        self.audio.start_loading()
+        # 根据实测帧耗时自动升降画质
+        self.governor = QualityGovernor(self)
 
         self.stats = GameStats(self)
         self.sb = Scoreboard(self)
 
         self.ship = Ship(self)
-        self.bullets = pygame.sprite.Group()
-        self.aliens = pygame.sprite.Group()
+        self.bullets = BulletPool(self)
+        self.aliens = create_fleet(self)
 
         self._create_fleet()
         self.game_active = False
         self.current_difficulty = 'normal'
         self.show_help = False
 
+        # 游戏状态：'menu'、'playing'、'respawning'、'level_clear'、'game_over'
+        self.state = 'menu'
+        self.state_timer = 0.0
+        self.seed = None
+        self._fire_requested = False
+        self.banner_font = get_font(None, 72)
+
+        # 开启threaded_simulation时模拟在单独的线程中推进，sim_lock保护所有模拟状态，
+        # 渲染只读取snapshots中最近发布的快照
+        self.sim_lock = threading.Lock()
+        self.snapshots = None
+        self._sim_thread = None
+
+        # 菜单和游戏说明只在语言、分辨率或难度变化时重新合成
+        self._menu_cache = None
+        self._help_cache = None
+
         # 创建按钮
         self.play_button = Button(self, 'Play')
         self.help_button = Button(self, 'How to Play')
         self._create_difficulty_buttons()
         self._position_help_button()
 
+        self.startup_time = perf_counter() - start
+
+    def _create_framebuffer(self):
+        '''按render_scale创建渲染目标，以及把它放大到窗口所需的对象'''
+        size = self.screen_rect.size
+        scale = self.render_scale
+        render_size = (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+        self.scaler = None
+        if self.offscreen:
+            if self.window is None:
+                self.window = pygame.Surface(render_size)
+            self.screen = self.window
+        elif render_size == size and self.window.get_size() == size:
+            self.screen = self.window
+        else:
+            self.screen = pygame.Surface(render_size, 0, self.window)
+            self.scaler = FrameScaler(self.window, self.screen, size,
+                                      self.settings.smooth_scaling)
+        self.renderer.screen = self.screen
+        self.renderer.scaled = self.scaler is not None
+        self.renderer.invalidate()
+        self.batch = RenderBatch(self.screen, self.screen.get_width() / size[0],
+                                 self.settings.smooth_scaling)
+
+    def set_render_scale(self, scale):
+        '''运行中修改内部渲染分辨率的比例；离屏实例的渲染目标不变'''
+        if self.offscreen or scale == self.render_scale:
+            return
+        self.render_scale = scale
+        self._create_framebuffer()
+
     def _position_help_button(self):
         '''设置玩法说明按钮的位置'''
-        center_x = self.screen.get_rect().centerx
-        center_y = self.screen.get_rect().centery
+        center_x = self.screen_rect.centerx
+        center_y = self.screen_rect.centery
         self.help_button.rect.center = (center_x, center_y + 120)
         self.help_button.msg_image_rect.center = self.help_button.rect.center
 
-    def _load_sounds(self):
-        '''加载所有声音文件'''
-        self.shoot_sound = None
-        self.explosion_sound = None
-        try:
-            self.shoot_sound = pygame.mixer.Sound('sounds/shoot.wav')
-            self.shoot_sound.set_volume(self.settings.shoot_volume)
-            self.explosion_sound = pygame.mixer.Sound('sounds/explosion.wav')
-            self.explosion_sound.set_volume(self.settings.explosion_volume)
-            pygame.mixer.music.load('sounds/background.mp3')
-            pygame.mixer.music.set_volume(self.settings.background_volume)
-        except:
-            pass  # 静默失败
-
-    def _play_sound(self, sound):
-        '''播放声音'''
-        if self.settings.sound_enabled and sound:
-            sound.play()
-
     def run_game(self):
-        '''开始游戏的主循环'''
+        '''开始游戏的主循环
+
+        模拟按settings.tick_rate以固定步长推进，与渲染帧率无关；
+        渲染时在最近两个tick之间插值，帧率可以不限或高于模拟频率
+        '''
+        print(f'启动耗时 {self.startup_time * 1000:.0f} ms')
+        self._print_cache_stats()
+        if self.settings.threaded_simulation:
+            self._run_threaded()
+            return
+        accumulator = 0.0
+        while True:
+            frame_time = self.clock.tick(self.settings.frame_rate) / 1000
+            accumulator += min(frame_time, self.settings.max_frame_time)
+            if self.settings.adaptive_quality:
+                # get_rawtime是上一帧实际工作的时间，不含tick的等待
+                self.governor.sample(self.clock.get_rawtime() / 1000)
+            # 关闭性能分析时每帧只多一次属性判断
+            if self.profiler.enabled:
+                accumulator = self._run_frame_profiled(accumulator)
+            else:
+                accumulator = self._run_frame(accumulator)
+
+    def _run_frame(self, accumulator):
+        '''处理事件、推进模拟并渲染一帧，返回剩余的累积时间'''
+        tick = 1 / self.settings.tick_rate
+        self._check_events()
+        accumulator = self._simulate(accumulator, tick)
+        self.audio.flush()
+        self._update_screen(accumulator / tick if self.game_active else 1.0)
+        return accumulator
+
+    def _run_frame_profiled(self, accumulator):
+        '''与_run_frame相同，但把各阶段耗时记录到性能分析器'''
+        tick = 1 / self.settings.tick_rate
+        start = perf_counter()
+        self._check_events()
+        events_done = perf_counter()
+        narrow_checks = self.aliens.narrow_checks
+        accumulator = self._simulate(accumulator, tick)
+        sounds = self.audio.flush()
+        simulate_done = perf_counter()
+        self._update_screen(accumulator / tick if self.game_active else 1.0)
+        render_done = perf_counter()
+
+        self.profiler.record(
+            start, (events_done - start, simulate_done - events_done,
+                    render_done - simulate_done),
+            len(self.aliens), len(self.bullets), self.clock.get_fps(),
+            sounds=sounds, draw_calls=self.batch.draw_calls, blits=self.batch.images,
+            tier=self.governor.tier, narrow=self.aliens.narrow_checks - narrow_checks)
+        return accumulator
+
+    def _run_threaded(self):
+        '''模拟线程按固定步长推进并发布快照，主线程只处理事件和渲染最新的快照
+
+        渲染或提交画面时的卡顿不会推迟碰撞检测和输入处理；
+        两个线程只在处理事件和推进一个tick时竞争模拟锁
+        '''
+        self.snapshots = SnapshotBuffer()
+        with self.sim_lock:
+            self.snapshots.publish(take_snapshot(self))
+        self._sim_thread = threading.Thread(
+            target=self._simulation_loop, name='simulation', daemon=True)
+        self._sim_thread.start()
+
+        game_active = self.game_active
+        narrow_checks = self.aliens.narrow_checks
         while True:
-            self._check_events()
+            self.clock.tick(self.settings.frame_rate)
+            if self.settings.adaptive_quality:
+                self.governor.sample(self.clock.get_rawtime() / 1000)
+            start = perf_counter()
+            with self.sim_lock:
+                self._check_events()
+                sounds = self.audio.flush()
+            events_done = perf_counter()
+
+            snapshot = self.snapshots.latest()
+            if snapshot.game_active != game_active:
+                # 游戏结束回到菜单发生在模拟线程中，鼠标和整屏重绘由主线程处理
+                game_active = snapshot.game_active
+                pygame.mouse.set_visible(not game_active)
+                self.renderer.invalidate()
+            alpha = 1.0
+            if game_active:
+                alpha = min(1.0, (events_done - snapshot.time) * self.settings.tick_rate)
+            self._render_snapshot(snapshot, alpha)
+
+            if self.profiler.enabled:
+                render_done = perf_counter()
+                # 像素判断发生在模拟线程中，这里统计自上一帧以来的次数
+                narrow = self.aliens.narrow_checks - narrow_checks
+                narrow_checks += narrow
+                self.profiler.record(
+                    start, (events_done - start, 0.0, render_done - events_done),
+                    len(snapshot.aliens), len(snapshot.bullets), self.clock.get_fps(),
+                    sounds=sounds, draw_calls=self.batch.draw_calls,
+                    blits=self.batch.images, tier=self.governor.tier, narrow=narrow)
+
+    def _simulation_loop(self):
+        '''模拟线程：每隔一个tick推进一次模拟并发布快照'''
+        tick = 1 / self.settings.tick_rate
+        ticks = 0
+        deadline = perf_counter()
+        while True:
+            delay = deadline - perf_counter()
+            if delay > 0:
+                sleep(delay)
+            with self.sim_lock:
+                if self.game_active:
+                    self._run_tick(self._live_actions())
+                    ticks += 1
+                self.snapshots.publish(take_snapshot(self, ticks))
+            deadline += tick
+            # 落后超过max_frame_time时放弃追赶，与单线程主循环限制累积时间的做法一致
+            if perf_counter() - deadline > self.settings.max_frame_time:
+                deadline = perf_counter()
+
+    def _simulate(self, accumulator, tick):
+        '''用累积的时间推进尽可能多的固定tick，返回剩余时间'''
+        while accumulator >= tick:
             if self.game_active:
-                self.ship.update()
-                self._update_bullets()
-                self._update_aliens()
-            self._update_screen()
-            self.clock.tick(60)
+                self._run_tick(self._live_actions())
+            accumulator -= tick
+        return accumulator
+
+    def _update_game(self, dt):
+        '''推进一个模拟tick，dt是一个tick代表的秒数'''
+        if self.state == 'playing':
+            self.ship.update()
+            self._update_bullets()
+            self._update_aliens()
+            return
+
+        # 停顿状态下照常处理事件和渲染，只是倒计时结束前不推进模拟
+        self._settle_motion()
+        self.state_timer -= dt
+        if self.state_timer <= 0:
+            self._finish_state()
+
+    def _settle_motion(self):
+        '''本tick没有移动任何东西，让插值停在当前位置'''
+        self.ship.prev_x = self.ship.x
+        self.bullets.settle()
+        self.aliens.settle()
+
+    def _set_state(self, state, duration=0.0):
+        '''切换游戏状态，duration秒后由_finish_state结束停顿'''
+        self.state = state
+        self.state_timer = duration
+
+    def _finish_state(self):
+        '''停顿结束后进入下一个状态'''
+        if self.state == 'level_clear':
+            self._create_fleet()
+        elif self.state == 'game_over':
+            self._stop_recording()
+            self.game_active = False
+            self._set_state('menu')
+            self.renderer.invalidate()
+            if not self.offscreen and self._sim_thread is None:
+                pygame.mouse.set_visible(True)
+            return
+        self._set_state('playing')
+
+    def reset(self, difficulty=None):
+        '''以指定难度开始新游戏，供无头模式和脚本使用'''
+        if difficulty is not None:
+            self._set_difficulty(difficulty)
+        self._start_game()
+
+    def step(self, actions=()):
+        '''不渲染、不等待地推进一个模拟tick
+
+        actions可以包含'left'、'right'和'fire'，也可以是已编码的位掩码，
+        返回游戏是否仍在进行
+        '''
+        if not isinstance(actions, int):
+            actions = encode_actions(actions)
+        if self.game_active:
+            self._run_tick(actions)
+        return self.game_active
+
+    def _live_actions(self):
+        '''把玩家当前的按键状态编码为一个tick的输入'''
+        actions = 0
+        if self.ship.moving_left:
+            actions |= ACTION_LEFT
+        if self.ship.moving_right:
+            actions |= ACTION_RIGHT
+        if self._fire_requested:
+            actions |= ACTION_FIRE
+            self._fire_requested = False
+        return actions
+
+    def _run_tick(self, actions):
+        '''用一个tick的输入推进模拟；实时游戏和回放都经过这里，保证结果一致'''
+        self.ship.moving_left = bool(actions & ACTION_LEFT)
+        self.ship.moving_right = bool(actions & ACTION_RIGHT)
+        if actions & ACTION_FIRE:
+            self._fire_bullet()
+        self._update_game(1 / self.settings.tick_rate)
+        if self.recorder is not None:
+            self.recorder.record(actions, self)
+
+    def _stop_recording(self):
+        '''结束当前录像'''
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
     def _check_events(self):
         '''响应按键和鼠标事件'''
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self._quit_game()
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.renderer.invalidate()
             elif event.type == pygame.KEYDOWN:
                 self._check_keydown_events(event)
             elif event.type == pygame.KEYUP:
                 self._check_keyup_events(event)
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
+                mouse_pos = self._to_sim(pygame.mouse.get_pos())
                 self._check_play_button(mouse_pos)
                 self._check_difficulty_buttons(mouse_pos)
                 self._check_help_button(mouse_pos)
 
+    def _to_sim(self, pos):
+        '''把窗口中的坐标换算为模拟坐标'''
+        if self.scaler is None:
+            return pos
+        return self.scaler.to_sim(pos)
+
     def _quit_game(self):
         '''退出游戏'''
-        pygame.mixer.music.stop()
-        self.stats.save_high_scores()
+        self.audio.stop_music()
+        self._stop_recording()
+        self.stats.close()
+        self._print_cache_stats()
         sys.exit()
 
+    def _print_cache_stats(self):
+        '''打印资源缓存和文字缓存的加载次数与命中统计'''
+        assets = self.assets.stats()
+        text = text_cache.stats()
+        print(f"资源缓存：从磁盘加载 {assets['loads']} 次，命中 {assets['hits']}，"
+              f"未命中 {assets['misses']}（图像 {assets['images']}，掩码 {assets['masks']}，"
+              f"声音 {assets['sounds']}）")
+        print(f"文字缓存：命中 {text['hits']}，未命中 {text['misses']}，"
+              f"缓存 {text['surfaces']} 张图像")
+
     def _check_help_button(self, mouse_pos):
         '''检查是否点击说明按钮'''
         if not self.game_active and self.help_button.rect.collidepoint(mouse_pos):
             self.show_help = True
+            self.renderer.invalidate()
 
     def _check_difficulty_buttons(self, mouse_pos):
         '''检查难度按钮'''
@@ -131,8 +454,8 @@ class AlienInvasion:
         self.normal_button = Button(self, 'Normal')
         self.hard_button = Button(self, 'Hard')
 
-        center_x = self.screen.get_rect().centerx
-        center_y = self.screen.get_rect().centery
+        center_x = self.screen_rect.centerx
+        center_y = self.screen_rect.centery
         button_y = center_y - 80
         spacing = 220
 
@@ -156,6 +479,7 @@ class AlienInvasion:
         self.stats.high_score = self.stats.high_scores[difficulty]
         self.sb.prep_high_score()
         self._update_button_colors(difficulty)
+        self.renderer.invalidate()
 
     def _update_button_colors(self, selected):
         '''更新按钮颜色'''
@@ -190,19 +514,29 @@ class AlienInvasion:
         self.sb.prep_high_score()
 
         self.game_active = True
+        self._set_state('playing')
+        self._fire_requested = False
+
+        # 每局使用确定的随机种子，录像回放时才能重现
+        self.seed = self.settings.seed
+        if self.seed is None:
+            self.seed = random.randrange(2 ** 32)
+        random.seed(self.seed)
+        self._stop_recording()
+        if self.record_dir is not None:
+            self.recorder = SessionRecorder.in_directory(
+                self.record_dir, self.current_difficulty, self.seed,
+                self.settings.tick_rate)
+        self.renderer.invalidate()
         self.bullets.empty()
         self.aliens.empty()
 
         self._create_fleet()
         self.ship.center_ship()
 
-        if self.settings.sound_enabled:
-            try:
-                pygame.mixer.music.play(-1)
-            except:
-                pass
-
-        pygame.mouse.set_visible(False)
+        self.audio.play_music()
+        if not self.offscreen:
+            pygame.mouse.set_visible(False)
 
     def _check_keydown_events(self, event):
         '''按键按下'''
@@ -213,12 +547,19 @@ class AlienInvasion:
             self.ship.moving_left = True
         elif key == pygame.K_q:
             self._quit_game()
+        elif key == pygame.K_F3:
+            self.profiler.toggle_overlay()
+            self.renderer.invalidate()
+        elif key == pygame.K_F4:
+            self.profiler.export_chrome_trace(f"profile-{strftime('%Y%m%d-%H%M%S')}.json")
         elif key == pygame.K_SPACE:
-            self._fire_bullet()
+            # 在下一个tick开火，录像才能精确重现
+            self._fire_requested = True
         elif key == pygame.K_p and not self.game_active:
             self._start_game()
         elif key == pygame.K_ESCAPE and self.show_help:
             self.show_help = False
+            self.renderer.invalidate()
 
     def _check_keyup_events(self, event):
         '''按键释放'''
@@ -230,26 +571,21 @@ class AlienInvasion:
 
     def _fire_bullet(self):
         '''发射子弹'''
-        if len(self.bullets) < self.settings.bullet_allowed:
-            self.bullets.add(Bullet(self))
-            self._play_sound(self.shoot_sound)
+        if self.state == 'playing' and len(self.bullets) < self.settings.bullet_allowed:
+            self.bullets.fire(self.ship.rect.midtop)
+            self.audio.play('shoot')
 
     def _update_bullets(self):
         '''更新子弹'''
         self.bullets.update()
-        for bullet in self.bullets.copy():
-            if bullet.rect.bottom <= 0:
-                self.bullets.remove(bullet)
         self._check_bullet_alien_collisions()
 
     def _check_bullet_alien_collisions(self):
         '''检查子弹碰撞'''
-        collisions = pygame.sprite.groupcollide(
-            self.bullets, self.aliens, True, True
-        )
+        collisions = self.aliens.collide_bullets(self.bullets)
 
         if collisions:
-            self._play_sound(self.explosion_sound)
+            self.audio.play('explosion')
             for aliens in collisions.values():
                 self.stats.score += self.settings.alien_points * len(aliens)
             self.sb.prep_score()
@@ -257,25 +593,26 @@ class AlienInvasion:
                 self.sb.prep_high_score()
 
         if not self.aliens:
+            # 新舰队在关卡切换的停顿结束后才出现
             self.bullets.empty()
-            self._create_fleet()
             self.settings.increase_speed()
             self.stats.level += 1
             self.sb.prep_level()
+            self._set_state('level_clear', self.settings.level_clear_delay)
 
     def _update_aliens(self):
         '''更新外星人'''
         self._check_fleet_edges()
         self.aliens.update()
 
-        if pygame.sprite.spritecollideany(self.ship, self.aliens):
+        if self.aliens.collide_ship(self.ship):
             self._ship_hit()
+            return
         self._check_alien_bottom()
 
     def _create_fleet(self):
         '''创建外星舰队'''
-        alien = Alien(self)
-        width, height = alien.rect.size
+        width, height = self.aliens.width, self.aliens.height
 
         x, y = width, height
         while y < self.settings.screen_height - 3 * height:
@@ -287,80 +624,161 @@ class AlienInvasion:
 
     def _create_alien(self, x, y):
         '''创建单个外星人'''
-        alien = Alien(self)
-        alien.x = x
-        alien.rect.x = x
-        alien.rect.y = y
-        self.aliens.add(alien)
+        self.aliens.spawn(x, y)
 
     def _check_fleet_edges(self):
         '''检查边缘'''
-        for alien in self.aliens.sprites():
-            if alien.check_edges():
-                self._change_fleet_direction()
-                break
+        if self.aliens.check_edges():
+            self._change_fleet_direction()
 
     def _change_fleet_direction(self):
         '''改变方向'''
-        for alien in self.aliens.sprites():
-            alien.rect.y += self.settings.fleet_drop_speed
+        self.aliens.drop(self.settings.fleet_drop_speed)
         self.settings.fleet_direction *= -1
 
-    def _update_screen(self):
-        '''更新屏幕'''
-        self.screen.fill(self.settings.bg_color)
+    def _update_screen(self, alpha=1.0):
+        '''更新屏幕，只擦除和提交发生变化的区域
 
-        for bullet in self.bullets.sprites():
-            bullet.draw_bullet()
+        alpha是当前时刻在上一个tick和当前tick之间的位置，用于插值
+        '''
+        batch = self.batch
+        batch.begin()
+        # 菜单画面静止时跳过整帧
+        if (not self.game_active and self.renderer.is_idle()
+                and not self.profiler.show_overlay):
+            return
 
-        self.ship.blitme()
-        self.aliens.draw(self.screen)
-        self.sb.show_score()
+        # 所有精灵、HUD和菜单都加入同一个批次，最后一次提交
+        batch.note(self.renderer.begin())
+        self.bullets.draw(batch, alpha)
+        self.ship.blitme(batch, alpha)
+        self.aliens.draw(batch, alpha)
+        self.sb.show_score(batch)
+        if self.state in BANNER_STATES:
+            self._draw_state_banner(self.state, self.state_timer, self.stats.level)
+        self._finish_frame(self.game_active)
+
+    def _render_snapshot(self, snapshot, alpha=1.0):
+        '''把模拟线程发布的快照渲染为一帧，不读取任何模拟对象的状态'''
+        batch = self.batch
+        batch.begin()
+        if (not snapshot.game_active and self.renderer.is_idle()
+                and not self.profiler.show_overlay):
+            return
 
-        if not self.game_active:
+        batch.note(self.renderer.begin())
+        # 与实时渲染使用同一组函数生成绘制命令
+        t = 1 - alpha
+        batch.extend(bullet_commands(self.bullets.image(), snapshot.bullets, t))
+        batch.add(*ship_command(self.ship.image, snapshot.ship, t))
+        batch.extend(formation_commands(
+            self.aliens.image, snapshot.aliens, snapshot.fleet_motion, t))
+        self.sb.show_score(batch, snapshot.hud)
+        if snapshot.state in BANNER_STATES:
+            self._draw_state_banner(snapshot.state, snapshot.state_timer, snapshot.hud[2])
+        self._finish_frame(snapshot.game_active)
+
+    def _finish_frame(self, game_active):
+        '''加入菜单或说明界面，提交批次并把画面显示到窗口'''
+        batch = self.batch
+        if not game_active:
             if not self.show_help:
-                self.play_button.draw_button()
-                self.easy_button.draw_button()
-                self.normal_button.draw_button()
-                self.hard_button.draw_button()
-                self.help_button.draw_button()
+                self._draw_menu()
             else:
                 self._draw_help_screen()
-
-        pygame.display.flip()
+        rects = batch.flush()
+        if self.scaler is not None:
+            self.scaler.present()
+
+        # 性能面板直接画在窗口上，不随渲染分辨率缩放
+        if self.profiler.show_overlay:
+            rects.append(self.profiler.draw_overlay(
+                self.window, 1 / self.settings.tick_rate))
+            batch.note()
+
+        self.renderer.present(rects)
+
+    def _draw_state_banner(self, state, state_timer, level):
+        '''在屏幕中央绘制停顿状态的提示和倒计时'''
+        if state == 'respawning':
+            msg = f'Get Ready {ceil(state_timer * 10) / 10:.1f}'
+        elif state == 'level_clear':
+            msg = f'Level {level}'
+        else:
+            msg = 'Game Over'
+        image = text_cache.render(self.banner_font, msg, (30, 30, 30), self.settings.bg_color)
+        self.batch.add(image, image.get_rect(center=self.screen_rect.center))
+
+    def _overlay_key(self):
+        '''菜单和说明缓存的失效条件'''
+        return (self.settings.language, self.screen_rect.size, self.current_difficulty,
+                self.settings.help_overlay_alpha)
+
+    def _draw_menu(self):
+        '''把缓存的菜单按钮作为一条命令加入绘制批次'''
+        key = self._overlay_key()
+        if self._menu_cache is None or self._menu_cache[0] != key:
+            self._menu_cache = (key, *self._render_menu())
+            self.profiler.note_alloc()
+        _, image, rect = self._menu_cache
+        self.batch.add(image, rect)
+
+    def _render_menu(self):
+        '''把所有按钮合成到一张透明图像上，返回图像及其位置'''
+        buttons = [self.play_button, self.easy_button, self.normal_button,
+                   self.hard_button, self.help_button]
+        area = buttons[0].rect.unionall([btn.rect for btn in buttons[1:]])
+        image = pygame.Surface(area.size, pygame.SRCALPHA)
+        for btn in buttons:
+            btn.draw_button(image, (-area.x, -area.y))
+        return image, area
 
     def _draw_help_screen(self):
-        '''绘制帮助界面'''
-        # 半透明遮罩
-        overlay = pygame.Surface((self.settings.screen_width, self.settings.screen_height))
-        overlay.set_alpha(200)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
+        '''把缓存的帮助界面作为一条命令加入绘制批次'''
+        key = self._overlay_key()
+        if self._help_cache is None or self._help_cache[0] != key:
+            self._help_cache = (key, self._render_help_screen())
+            self.profiler.note_alloc()
+        self.batch.add(self._help_cache[1], (0, 0))
+
+    def _render_help_screen(self):
+        '''把半透明遮罩和说明文字合成为一张整屏图像'''
+        if self.settings.help_overlay_alpha:
+            # 半透明遮罩
+            overlay = pygame.Surface(self.screen_rect.size, pygame.SRCALPHA)
+            overlay.fill((0, 0, 0, 200))
+        else:
+            # 低画质时用不透明背景（接近遮罩盖在背景色上的颜色），绘制时不必逐像素混合
+            overlay = to_display_format(pygame.Surface(self.screen_rect.size))
+            overlay.fill((50, 50, 50))
+        if self.settings.language != 'zh':
+            self._render_english_help(overlay)
+            return overlay
 
         # 加载字体
         try:
             font_path = 'fonts/msyh.ttc'
             fonts = {
-                'title': pygame.font.Font(font_path, 48),
-                'heading': pygame.font.Font(font_path, 36),
-                'text': pygame.font.Font(font_path, 24),
-                'small': pygame.font.Font(font_path, 20)
+                'title': get_font(font_path, 48),
+                'heading': get_font(font_path, 36),
+                'text': get_font(font_path, 24),
+                'small': get_font(font_path, 20)
             }
         except:
             try:
                 fonts = {
-                    'title': pygame.font.SysFont('microsoftyaheui', 48),
-                    'heading': pygame.font.SysFont('microsoftyaheui', 36),
-                    'text': pygame.font.SysFont('microsoftyaheui', 24),
-                    'small': pygame.font.SysFont('microsoftyaheui', 20)
+                    'title': get_font('microsoftyaheui', 48),
+                    'heading': get_font('microsoftyaheui', 36),
+                    'text': get_font('microsoftyaheui', 24),
+                    'small': get_font('microsoftyaheui', 20)
                 }
             except:
-                self._draw_english_help()
-                return
+                self._render_english_help(overlay)
+                return overlay
 
         # 标题
         title = fonts['title'].render("游戏说明", True, (255, 255, 255))
-        self.screen.blit(title, title.get_rect(center=(self.settings.screen_width // 2, 50)))
+        overlay.blit(title, title.get_rect(center=(self.settings.screen_width // 2, 50)))
 
         y, spacing = 100, 30
         left = 150
@@ -377,56 +795,77 @@ class AlienInvasion:
 
         for title, color, font, items in sections:
             text = font.render(title, True, color)
-            self.screen.blit(text, (left, y))
+            overlay.blit(text, (left, y))
             y += 35
 
             for item in items:
                 use_font = fonts['small'] if "难度" in title else fonts['text']
                 text = use_font.render(item, True, (255, 255, 255))
-                self.screen.blit(text, (left + 30, y))
+                overlay.blit(text, (left + 30, y))
                 y += 25 if "难度" in title else spacing
             y += 10
 
         # 返回提示
         back = fonts['small'].render("按 ESC 键返回", True, (200, 200, 200))
-        self.screen.blit(back, back.get_rect(center=(self.settings.screen_width // 2, 750)))
+        overlay.blit(back, back.get_rect(center=(self.settings.screen_width // 2, 750)))
+        return overlay
 
-    def _draw_english_help(self):
+    def _render_english_help(self, surface):
         '''英文帮助（简化版）'''
-        font = pygame.font.Font(None, 36)
+        font = get_font(None, 36)
         texts = ["How to Play", "ESC to return"]
         y = 200
         for text in texts:
-            surface = font.render(text, True, (255, 255, 255))
-            rect = surface.get_rect(center=(self.settings.screen_width // 2, y))
-            self.screen.blit(surface, rect)
+            image = font.render(text, True, (255, 255, 255))
+            rect = image.get_rect(center=(self.settings.screen_width // 2, y))
+            surface.blit(image, rect)
             y += 50
 
     def _ship_hit(self):
         '''飞船被撞'''
         if self.stats.ships_left > 0:
-            self._play_sound(self.explosion_sound)
+            self.audio.play('explosion')
             self.stats.ships_left -= 1
             self.sb.prep_ships()
             self.bullets.empty()
             self.aliens.empty()
             self._create_fleet()
             self.ship.center_ship()
-            sleep(0.5)
+            self._set_state('respawning', self.settings.respawn_delay)
         else:
-            pygame.mixer.music.stop()
+            self.audio.stop_music()
             self.stats.save_high_scores()
-            self.game_active = False
-            pygame.mouse.set_visible(True)
+            self._set_state('game_over', self.settings.game_over_delay)
 
     def _check_alien_bottom(self):
         '''检查外星人到底部'''
-        for alien in self.aliens.sprites():
-            if alien.rect.bottom >= self.settings.screen_height:
-                self._ship_hit()
-                break
+        if self.aliens.reached_bottom():
+            self._ship_hit()
 
 
 if __name__ == '__main__':
-    ai = AlienInvasion()
+    parser = argparse.ArgumentParser(description='外星人入侵')
+    parser.add_argument('--record', metavar='DIR',
+                        help='把每局游戏的输入和状态哈希录制到DIR，之后可用replay.py回放')
+    parser.add_argument('--profile', action='store_true',
+                        help='启动时打开性能面板（游戏中按F3切换，F4导出Chrome trace）')
+    parser.add_argument('--no-audio', action='store_true',
+                        help='不初始化混音器，适合没有声卡的主机')
+    parser.add_argument('--render-scale', type=float, default=1.0,
+                        help='内部渲染分辨率相对于1200×800的比例，如0.5')
+    parser.add_argument('--smooth', action='store_true', help='放大画面时使用平滑缩放')
+    parser.add_argument('--fullscreen', action='store_true',
+                        help='以显示器原生分辨率全屏运行，画面保持宽高比')
+    parser.add_argument('--threaded', action='store_true',
+                        help='模拟在单独的线程中按固定频率推进，不受渲染卡顿影响')
+    args = parser.parse_args()
+
+    settings = Settings()
+    settings.render_scale = args.render_scale
+    settings.smooth_scaling = args.smooth
+    settings.fullscreen = args.fullscreen
+    settings.threaded_simulation = args.threaded
+    ai = AlienInvasion(record_dir=args.record, audio=not args.no_audio, settings=settings)
+    if args.profile:
+        ai.profiler.toggle_overlay()
     ai.run_game()
\ No newline at end of file
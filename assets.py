@@ -0,0 +1,90 @@
+import pygame
+
+
+def to_display_format(image, alpha=None):
+    '''显示模式已设置时，把图像转换为与屏幕相同的像素格式，否则原样返回
+
+    alpha为None时按图像是否带透明度决定用convert_alpha()还是convert()
+    '''
+    if pygame.display.get_surface() is None:
+        return image
+    if alpha is None:
+        alpha = image.get_alpha() is not None
+    return image.convert_alpha() if alpha else image.convert()
+
+
+class AssetCache:
+    '''集中加载并共享图像和声音资源的类'''
+
+    def __init__(self):
+        '''初始化缓存和统计数据'''
+        self.images = {}
+        self.sounds = {}
+        self.masks = {}
+
+        # 统计信息：实际从磁盘加载的次数、命中和未命中次数
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def image(self, path):
+        '''返回共享的图像，首次请求时才从磁盘加载'''
+        image = self.images.get(path)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        self.loads += 1
+        image = to_display_format(pygame.image.load(path))
+        self.images[path] = image
+        return image
+
+    def mask(self, path):
+        '''返回图像共享的碰撞掩码，首次请求时才生成
+
+        带透明通道的图像取不透明的像素，其他图像把左上角的颜色当作背景
+        '''
+        mask = self.masks.get(path)
+        if mask is not None:
+            self.hits += 1
+            return mask
+
+        self.misses += 1
+        # 直接读取图像缓存，生成掩码不应计为一次图像命中
+        image = self.images.get(path)
+        if image is None:
+            image = self.image(path)
+        if image.get_flags() & pygame.SRCALPHA:
+            mask = pygame.mask.from_surface(image)
+        else:
+            mask = pygame.mask.from_threshold(image, image.get_at((0, 0)), (1, 1, 1, 255))
+            mask.invert()
+        self.masks[path] = mask
+        return mask
+
+    def sound(self, path, volume=None):
+        '''返回共享的声音对象，首次请求时才从磁盘加载'''
+        sound = self.sounds.get(path)
+        if sound is not None:
+            self.hits += 1
+            return sound
+
+        self.misses += 1
+        self.loads += 1
+        sound = pygame.mixer.Sound(path)
+        if volume is not None:
+            sound.set_volume(volume)
+        self.sounds[path] = sound
+        return sound
+
+    def stats(self):
+        '''返回加载次数和命中统计'''
+        return {
+            'loads': self.loads,
+            'hits': self.hits,
+            'misses': self.misses,
+            'images': len(self.images),
+            'masks': len(self.masks),
+            'sounds': len(self.sounds),
+        }
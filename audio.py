@@ -0,0 +1,222 @@
+import threading
+from time import perf_counter
+
+import pygame
+
+
+class SoundScheduler:
+    '''为每种音效保留固定的混音通道，限制同时发声的数量
+
+    同一帧内重复请求的音效只播放一次；通道不够时按优先级抢占最早开始的声音，
+    所以无论一帧内有多少次碰撞，混音开销都有上限
+    '''
+
+    def __init__(self, settings):
+        '''按settings.sound_channels为每种音效分配保留通道'''
+        self.settings = settings
+        self.priorities = settings.sound_priorities
+
+        # 保留的通道不会被普通的Sound.play()占用
+        total = sum(settings.sound_channels.values())
+        if pygame.mixer.get_num_channels() < total:
+            pygame.mixer.set_num_channels(total)
+        pygame.mixer.set_reserved(total)
+
+        # 音效名称 -> 通道编号列表；每个通道最近一次开始播放的帧号
+        self.pools = {}
+        index = 0
+        for name, count in sorted(settings.sound_channels.items()):
+            self.pools[name] = list(range(index, index + count))
+            index += count
+        self.channels = [pygame.mixer.Channel(i) for i in range(total)]
+        self.owners = [None] * total
+        self.started = [0] * total
+
+        self.pending = {}
+        self.frame = 0
+        self.stats = {'requested': 0, 'coalesced': 0, 'played': 0,
+                      'stolen': 0, 'dropped': 0}
+
+    def request(self, name, sound):
+        '''登记一次播放请求，真正的播放在本帧的flush()中进行'''
+        self.stats['requested'] += 1
+        if name in self.pending:
+            self.stats['coalesced'] += 1
+        else:
+            self.pending[name] = sound
+
+    def flush(self):
+        '''按优先级从高到低播放本帧登记的音效，返回实际播放的数量'''
+        self.frame += 1
+        if not self.pending:
+            return 0
+
+        pending = sorted(self.pending.items(),
+                         key=lambda item: self.priorities.get(item[0], 0),
+                         reverse=True)
+        self.pending.clear()
+
+        voices = sum(channel.get_busy() for channel in self.channels)
+        played = 0
+        for name, sound in pending:
+            pool = self.pools.get(name)
+            if not pool:
+                self.stats['dropped'] += 1
+                continue
+
+            free = self._free_channel(pool)
+            victim = None
+            if free is None:
+                # 同种音效的通道全忙：重新触发最早开始的那个
+                victim = self._oldest(pool)
+            elif voices >= self.settings.max_voices:
+                victim = self._victim(name)
+                if victim is None:
+                    self.stats['dropped'] += 1
+                    continue
+
+            if victim is not None:
+                self.channels[victim].stop()
+                self.stats['stolen'] += 1
+                voices -= 1
+            index = free if free is not None else victim
+
+            self.channels[index].play(sound)
+            self.owners[index] = name
+            self.started[index] = self.frame
+            voices += 1
+            played += 1
+
+        self.stats['played'] += played
+        return played
+
+    def _free_channel(self, pool):
+        '''返回pool中空闲的通道编号，都在播放时返回None'''
+        for index in pool:
+            if not self.channels[index].get_busy():
+                return index
+        return None
+
+    def _oldest(self, indices):
+        '''返回indices中最早开始播放的通道编号'''
+        return min(indices, key=self.started.__getitem__, default=None)
+
+    def _victim(self, name):
+        '''达到发声上限时选择被抢占的通道：优先级更低的声音，其次是同种音效中最早的'''
+        priority = self.priorities.get(name, 0)
+        busy = [index for index, channel in enumerate(self.channels)
+                if channel.get_busy()]
+        lower = [index for index in busy
+                 if self.priorities.get(self.owners[index], 0) < priority]
+        if lower:
+            return min(lower, key=lambda index: (
+                self.priorities.get(self.owners[index], 0), self.started[index]))
+        return self._oldest([index for index in busy if self.owners[index] == name])
+
+
+class AudioManager:
+    '''在后台线程加载音效和背景音乐，加载完成前播放请求直接忽略，不会阻塞游戏'''
+
+    # 音效名称 -> (文件路径, 音量设置项)
+    SOUNDS = {
+        'shoot': ('sounds/shoot.wav', 'shoot_volume'),
+        'explosion': ('sounds/explosion.wav', 'explosion_volume'),
+    }
+    MUSIC = 'sounds/background.mp3'
+
+    def __init__(self, ai_game, enabled=True):
+        '''enabled为False时完全不初始化混音器，适合无声卡的主机'''
+        self.settings = ai_game.settings
+        self.assets = ai_game.assets
+        self.enabled = enabled
+
+        self.sounds = {}
+        self.music_loaded = False
+        self.errors = []
+        self.load_time = None
+
+        self._lock = threading.Lock()
+        self._music_wanted = False
+        self._thread = None
+        self.scheduler = None
+
+        if enabled:
+            try:
+                pygame.mixer.init()
+                self.scheduler = SoundScheduler(self.settings)
+            except pygame.error as e:
+                self.enabled = False
+                self.errors.append(f'混音器初始化失败：{e}')
+                # 加载线程不会启动，错误要在这里报告
+                print(f'混音器初始化失败，游戏将没有声音：{e}')
+
+    def start_loading(self):
+        '''启动后台加载线程'''
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._load, daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        '''后台线程：逐个解码音效和背景音乐，缺失的文件只记录错误'''
+        start = perf_counter()
+        for name, (path, volume) in self.SOUNDS.items():
+            try:
+                sound = self.assets.sound(path, getattr(self.settings, volume))
+            except (pygame.error, OSError) as e:
+                self.errors.append(f'{path}: {e}')
+                continue
+            with self._lock:
+                self.sounds[name] = sound
+
+        try:
+            pygame.mixer.music.load(self.MUSIC)
+            pygame.mixer.music.set_volume(self.settings.background_volume)
+        except (pygame.error, OSError) as e:
+            self.errors.append(f'{self.MUSIC}: {e}')
+        else:
+            with self._lock:
+                self.music_loaded = True
+                if self._music_wanted:
+                    self._start_music()
+
+        self.load_time = perf_counter() - start
+        print(f'音频加载完成，用时 {self.load_time * 1000:.0f} ms')
+        for error in self.errors:
+            print(f'无法加载声音 {error}')
+
+    def play(self, name):
+        '''请求播放音效，在本帧结束时由调度器统一播放；尚未加载或加载失败时什么也不做'''
+        if not self.settings.sound_enabled:
+            return
+        sound = self.sounds.get(name)
+        if sound is not None:
+            self.scheduler.request(name, sound)
+
+    def flush(self):
+        '''每帧调用一次，播放本帧请求的音效，返回实际播放的数量'''
+        if self.scheduler is None:
+            return 0
+        return self.scheduler.flush()
+
+    def play_music(self):
+        '''循环播放背景音乐；音乐还在加载时，加载完成后自动开始'''
+        if not (self.enabled and self.settings.sound_enabled
+                and self.settings.background_music):
+            return
+        with self._lock:
+            self._music_wanted = True
+            if self.music_loaded:
+                self._start_music()
+
+    def _start_music(self):
+        try:
+            pygame.mixer.music.play(-1)
+        except pygame.error:
+            pass
+
+    def stop_music(self):
+        '''停止背景音乐'''
+        with self._lock:
+            self._music_wanted = False
+            if self.music_loaded:
+                pygame.mixer.music.stop()
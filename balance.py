@@ -0,0 +1,201 @@
+'''用进程池批量运行无头游戏，为难度参数的调整提供统计数据
+
+示例：
+    python balance.py --speedup-scale 1.1 1.2 1.3 --games 200 -o runs.jsonl --report report.json
+'''
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+from multiprocessing import Pool
+from time import perf_counter
+
+DIFFICULTIES = ('easy', 'normal', 'hard')
+
+# 每个工作进程只创建一个无头游戏，反复重置使用
+_game = None
+
+
+def _init_worker():
+    '''工作进程初始化：创建无头游戏并关闭声音'''
+    global _game
+    from alien_invasion import AlienInvasion
+
+    _game = AlienInvasion(headless=True)
+    _game.settings.sound_enabled = False
+
+
+def random_policy(ai_game, tick):
+    '''随机策略：偶尔换方向，随机开火'''
+    if tick % 30 == 0:
+        ai_game.policy_direction = random.choice(('left', 'right', None))
+    actions = [ai_game.policy_direction] if ai_game.policy_direction else []
+    if random.random() < 0.3:
+        actions.append('fire')
+    return actions
+
+
+def scripted_policy(ai_game, tick):
+    '''脚本策略：移动到最低的外星人下方并持续开火
+
+    游戏本身没有随机性，这个策略的结果与种子无关，每组参数只需运行一局
+    '''
+    positions = ai_game.aliens.positions()
+    if not positions:
+        return ('fire',)
+    x, _ = max(positions, key=lambda position: position[1])
+    target = x + ai_game.ship.rect.width / 2
+    if target < ai_game.ship.rect.centerx - 5:
+        return ('left', 'fire')
+    if target > ai_game.ship.rect.centerx + 5:
+        return ('right', 'fire')
+    return ('fire',)
+
+
+POLICIES = {'random': random_policy, 'scripted': scripted_policy}
+# 结果与随机种子无关的策略
+DETERMINISTIC_POLICIES = {'scripted'}
+
+
+def run_job(job):
+    '''在当前工作进程中运行一局游戏，返回结果'''
+    ai = _game
+    ai.settings.speedup_scale = job['speedup_scale']
+    ai.settings.score_scale = job['score_scale']
+    ai.settings.seed = job['seed']
+    ai.policy_direction = None
+    ai.reset(job['difficulty'])
+
+    policy = POLICIES[job['policy']]
+    ticks = 0
+    start = perf_counter()
+    # 与vecenv相同，进入'game_over'时就结束，不模拟结束提示停留期间的tick
+    while (ticks < job['max_ticks'] and ai.state != 'game_over'
+           and ai.step(policy(ai, ticks))):
+        ticks += 1
+    elapsed = perf_counter() - start
+
+    return dict(job, level=ai.stats.level, score=ai.stats.score, ticks=ticks,
+                survived=ai.game_active and ai.state != 'game_over',
+                tick_ms=elapsed * 1000 / max(ticks, 1))
+
+
+class RunningStats:
+    '''增量计算均值、标准差和极值，不保存原始数据'''
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        std = math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {'mean': self.mean, 'std': std, 'min': self.min, 'max': self.max}
+
+
+def iter_jobs(args):
+    '''按参数网格逐个生成任务'''
+    grid = itertools.product(args.difficulties, args.speedup_scale,
+                             args.score_scale, args.policies)
+    seed = args.seed
+    for difficulty, speedup_scale, score_scale, policy in grid:
+        games = 1 if policy in DETERMINISTIC_POLICIES else args.games
+        for _ in range(games):
+            yield {
+                'difficulty': difficulty,
+                'speedup_scale': speedup_scale,
+                'score_scale': score_scale,
+                'policy': policy,
+                'seed': seed,
+                'max_ticks': args.max_ticks,
+            }
+            seed += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='外星人入侵难度平衡批量模拟')
+    parser.add_argument('--difficulties', nargs='+', default=list(DIFFICULTIES),
+                        choices=DIFFICULTIES)
+    parser.add_argument('--speedup-scale', type=float, nargs='+', default=[1.2])
+    parser.add_argument('--score-scale', type=float, nargs='+', default=[1.5])
+    parser.add_argument('--policies', nargs='+', default=['random'],
+                        choices=sorted(POLICIES))
+    parser.add_argument('--games', type=int, default=50,
+                        help='每组参数运行的局数（scripted策略是确定性的，只运行一局）')
+    parser.add_argument('--max-ticks', type=int, default=60 * 60 * 10,
+                        help='每局最多运行的tick数')
+    parser.add_argument('--seed', type=int, default=0, help='第一局的随机种子')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='工作进程数，默认使用全部CPU核心')
+    parser.add_argument('-o', '--output', help='逐局结果以JSON Lines格式流式写入该文件')
+    parser.add_argument('--report', help='把汇总报告保存为JSON文件')
+    args = parser.parse_args(argv)
+
+    groups = {}
+    output = open(args.output, 'w') if args.output else None
+    start = perf_counter()
+    games = 0
+    try:
+        with Pool(args.workers, initializer=_init_worker) as pool:
+            for result in pool.imap_unordered(run_job, iter_jobs(args), chunksize=4):
+                games += 1
+                if output:
+                    output.write(json.dumps(result) + '\n')
+
+                key = (result['difficulty'], result['speedup_scale'],
+                       result['score_scale'], result['policy'])
+                group = groups.setdefault(key, {
+                    'level': RunningStats(), 'score': RunningStats(),
+                    'tick_ms': RunningStats(), 'survived': 0})
+                group['level'].add(result['level'])
+                group['score'].add(result['score'])
+                group['tick_ms'].add(result['tick_ms'])
+                group['survived'] += result['survived']
+            # 显式关闭并等待工作进程退出，不依赖with结束时的terminate()
+            pool.close()
+            pool.join()
+    finally:
+        if output:
+            output.close()
+
+    report = []
+    for (difficulty, speedup_scale, score_scale, policy), group in sorted(groups.items()):
+        entry = {
+            'difficulty': difficulty,
+            'speedup_scale': speedup_scale,
+            'score_scale': score_scale,
+            'policy': policy,
+            'games': group['level'].count,
+            'survived': group['survived'],
+            'level': group['level'].as_dict(),
+            'score': group['score'].as_dict(),
+            'tick_ms': group['tick_ms'].as_dict(),
+        }
+        report.append(entry)
+        print(f"{difficulty:6s} speedup={speedup_scale:<4} score={score_scale:<4} {policy:8s} "
+              f"等级 {entry['level']['mean']:.2f}±{entry['level']['std']:.2f} "
+              f"得分 {entry['score']['mean']:.0f} "
+              f"tick {entry['tick_ms']['mean']:.3f}ms")
+
+    print(f'共 {games} 局，用时 {perf_counter() - start:.1f} 秒')
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
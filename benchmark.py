@@ -0,0 +1,199 @@
+'''无头运行游戏，统计每个帧阶段的耗时分布
+
+示例：
+    python benchmark.py --fleet-sizes 40 400 2000 --bullets 3 100 -o bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.2
+'''
+import argparse
+import json
+import platform
+import sys
+from time import perf_counter
+
+import pygame
+
+from alien_invasion import AlienInvasion
+from fleet import create_fleet
+
+# 要计时的阶段：(名称, 所属对象的取值函数, 方法名)
+PHASES = (
+    ('_check_events', lambda ai: ai, '_check_events'),
+    ('Ship.update', lambda ai: ai.ship, 'update'),
+    ('_update_bullets', lambda ai: ai, '_update_bullets'),
+    ('_check_bullet_alien_collisions', lambda ai: ai, '_check_bullet_alien_collisions'),
+    ('_update_aliens', lambda ai: ai, '_update_aliens'),
+    ('_update_screen', lambda ai: ai, '_update_screen'),
+)
+
+DIFFICULTIES = ('easy', 'normal', 'hard')
+
+
+def _timed(method, samples):
+    '''包装方法，把每次调用的耗时（毫秒）追加到samples'''
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        result = method(*args, **kwargs)
+        samples.append((perf_counter() - start) * 1000)
+        return result
+    return wrapper
+
+
+def _instrument(ai):
+    '''用实例属性覆盖各阶段方法，返回{阶段: 耗时列表}'''
+    timings = {}
+    for name, owner, attr in PHASES:
+        target = owner(ai)
+        samples = timings[name] = []
+        setattr(target, attr, _timed(getattr(target, attr), samples))
+    return timings
+
+
+def _populate(ai, fleet_size):
+    '''在屏幕上半部分紧凑地排列fleet_size个外星人'''
+    width, height = ai.assets.image('images/alien.bmp').get_size()
+    columns = max(1, (ai.settings.screen_width - 3 * width) // width)
+    rows = max(1, -(-fleet_size // columns))
+    row_step = min(height, max(1, (ai.settings.screen_height // 2) // rows))
+    for i in range(fleet_size):
+        row, column = divmod(i, columns)
+        ai.aliens.spawn(width + column * width, height + row * row_step)
+
+
+def percentile(samples, pct):
+    '''返回已排序样本的最近秩百分位数'''
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def summarize(samples):
+    '''计算耗时分布'''
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) if ordered else 0.0,
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+        'max': ordered[-1] if ordered else 0.0,
+    }
+
+
+def run_case(difficulty, fleet_size, bullets, ticks, backend='sprite'):
+    '''以给定参数运行一局无头游戏，返回各阶段的耗时分布'''
+    ai = AlienInvasion(headless=True)
+    ai.settings.fleet_backend = backend
+    ai.aliens = create_fleet(ai)
+    ai.reset(difficulty)
+    ai.settings.bullet_allowed = bullets
+
+    # 舰队被消灭或撞到飞船后，都按相同规模重新生成
+    ai._create_fleet = lambda: _populate(ai, fleet_size)
+    ai.aliens.empty()
+    ai._create_fleet()
+
+    timings = _instrument(ai)
+    for tick in range(ticks):
+        ai.stats.ships_left = ai.settings.ship_limit
+        direction = 'right' if (tick // 120) % 2 else 'left'
+        ai._check_events()
+        ai.step((direction, 'fire'))
+        ai._update_screen()
+
+    return {
+        'difficulty': difficulty,
+        'fleet_size': fleet_size,
+        'bullets': bullets,
+        'backend': backend,
+        'ticks': ticks,
+        'phases': {name: summarize(samples) for name, samples in timings.items()},
+    }
+
+
+def _case_key(result):
+    return (result['backend'], result['difficulty'],
+            result['fleet_size'], result['bullets'])
+
+
+def compare(results, baseline, tolerance, min_delta):
+    '''与基线比较p95，返回超出预算的阶段说明'''
+    base = {_case_key(r): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = base.get(_case_key(result))
+        if old is None:
+            continue
+        for name, stats in result['phases'].items():
+            old_p95 = old['phases'].get(name, {}).get('p95')
+            if old_p95 is None:
+                continue
+            limit = max(old_p95 * (1 + tolerance), old_p95 + min_delta)
+            if stats['p95'] > limit:
+                regressions.append(
+                    f"{'/'.join(map(str, _case_key(result)))} {name}: "
+                    f"p95 {stats['p95']:.3f}ms > {limit:.3f}ms (基线 {old_p95:.3f}ms)")
+    return regressions
+
+
+def _print_result(result):
+    print(f"[{result['backend']}] 难度={result['difficulty']} 外星人={result['fleet_size']} "
+          f"子弹={result['bullets']}")
+    for name, stats in result['phases'].items():
+        print(f"    {name:32s} p50={stats['p50']:.3f}ms p95={stats['p95']:.3f}ms "
+              f"p99={stats['p99']:.3f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='外星人入侵帧阶段基准测试')
+    parser.add_argument('--ticks', type=int, default=600, help='每个用例运行的tick数')
+    parser.add_argument('--fleet-sizes', type=int, nargs='+', default=[40, 400, 2000])
+    parser.add_argument('--bullets', type=int, nargs='+', default=[3, 100])
+    parser.add_argument('--difficulties', nargs='+', default=list(DIFFICULTIES),
+                        choices=DIFFICULTIES)
+    parser.add_argument('--backends', nargs='+', default=['sprite'],
+                        choices=['sprite', 'numpy'])
+    parser.add_argument('-o', '--output', help='把结果保存为JSON文件')
+    parser.add_argument('--baseline', help='用于比较的历史结果JSON文件')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='p95允许超出基线的比例')
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help='p95允许超出基线的最小毫秒数，避免噪声误报')
+    args = parser.parse_args(argv)
+
+    results = []
+    for backend in args.backends:
+        for difficulty in args.difficulties:
+            for fleet_size in args.fleet_sizes:
+                for bullets in args.bullets:
+                    result = run_case(difficulty, fleet_size, bullets,
+                                      args.ticks, backend)
+                    _print_result(result)
+                    results.append(result)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print('性能回退：')
+            for line in regressions:
+                print('    ' + line)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
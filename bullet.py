@@ -1,30 +1,113 @@
 import pygame
-from pygame.sprite import Sprite
 
-class Bullet(Sprite):
-    '''管理飞船所发射子弹的类'''
+from assets import to_display_format
+from renderer import bullet_commands
+
+
+class Bullet:
+    '''一颗子弹的紧凑记录，由BulletPool回收复用'''
+
+    __slots__ = ('rect', 'y', 'prev_y')
+
+    def __init__(self, width, height):
+        '''创建一个子弹槽位，位置在发射时设置'''
+        self.rect = pygame.Rect(0, 0, width, height)
+        # 存储用浮点数表示的子弹位置，prev_y是上一个tick的位置，用于插值渲染
+        self.y = 0.0
+        self.prev_y = 0.0
+
+
+class BulletPool:
+    '''管理飞船所发射子弹的池，飞出屏幕或击中目标的子弹槽位会被回收复用'''
 
     def __init__(self, ai_game):
-        '''在飞船的当前位置创建一个子弹对象'''
-        super().__init__()
-        self.screen = ai_game.screen
+        '''初始化子弹池'''
         self.settings = ai_game.settings
-        self.color = self.settings.bullet_color
+        self.active = []
+        self.free = []
+        self._image = None
+        # 子弹是实心矩形，所有子弹共享一个填满的碰撞掩码
+        self.mask = pygame.mask.Mask(
+            (self.settings.bullet_width, self.settings.bullet_height), fill=True)
+
+    def __len__(self):
+        return len(self.active)
+
+    def __bool__(self):
+        return bool(self.active)
 
-        # 在（0，0）处创建一个表示子弹的矩形，再设置正确的位置
-        self.rect = pygame.Rect(0, 0, self.settings.bullet_width, self.settings.bullet_height)
-        self.rect.midtop = ai_game.ship.rect.midtop
+    def __iter__(self):
+        return iter(self.active)
 
-        # 存储用浮点数表示的子弹位置
-        self.y = float(self.rect.y)
+    def sprites(self):
+        '''返回正在飞行的子弹（不复制）'''
+        return self.active
+
+    def fire(self, midtop):
+        '''从空闲槽位取出一颗子弹，放在midtop处'''
+        if self.free:
+            bullet = self.free.pop()
+        else:
+            bullet = Bullet(self.settings.bullet_width, self.settings.bullet_height)
+        bullet.rect.midtop = midtop
+        bullet.y = bullet.prev_y = float(bullet.rect.y)
+        self.active.append(bullet)
+        return bullet
+
+    def remove(self, *bullets):
+        '''回收指定的子弹，与update()一样一次遍历就地压缩活动列表，保持其余子弹的顺序'''
+        if not bullets:
+            return
+        hit = set(bullets)
+        active = self.active
+        keep = 0
+        for bullet in active:
+            if bullet in hit:
+                self.free.append(bullet)
+            else:
+                active[keep] = bullet
+                keep += 1
+        del active[keep:]
+
+    def empty(self):
+        '''回收所有子弹'''
+        self.free.extend(self.active)
+        self.active.clear()
 
     def update(self):
-        '''向上移动子弹'''
-        # 更新子弹的准确位置
-        self.y -=self.settings.bullet_speed
-        # 更新表示子弹的rect的位置
-        self.rect.y = self.y
-
-    def draw_bullet(self):
-        '''在屏幕上绘制子弹'''
-        pygame.draw.rect(self.screen, self.color, self.rect)
\ No newline at end of file
+        '''向上移动所有子弹，并就地回收飞出屏幕的子弹'''
+        step = self.settings.bullet_speed * self.settings.tick_scale
+        active = self.active
+        keep = 0
+        for bullet in active:
+            bullet.prev_y = bullet.y
+            bullet.y -= step
+            bullet.rect.y = bullet.y
+            if bullet.rect.bottom > 0:
+                active[keep] = bullet
+                keep += 1
+            else:
+                self.free.append(bullet)
+        del active[keep:]
+
+    def settle(self):
+        '''子弹本tick没有移动，停止插值'''
+        for bullet in self.active:
+            bullet.prev_y = bullet.y
+
+    def image(self):
+        '''返回所有子弹共享的图像，第一次调用时生成'''
+        if self._image is None:
+            self._image = to_display_format(pygame.Surface(
+                (self.settings.bullet_width, self.settings.bullet_height)))
+            self._image.fill(self.settings.bullet_color)
+        return self._image
+
+    def snapshot(self):
+        '''返回每颗子弹的(x, y, dy)：当前的整数位置和上一个tick相对当前的垂直偏移'''
+        return tuple((bullet.rect.x, bullet.rect.y, bullet.prev_y - bullet.y)
+                     for bullet in self.active)
+
+    def draw(self, batch, alpha=1.0):
+        '''把按alpha插值的子弹加入绘制批次，所有子弹共享预先生成的图像'''
+        batch.extend(bullet_commands(self.image(), self.snapshot(), 1 - alpha))
@@ -1,17 +1,19 @@
-import pygame.font
+import pygame
+
+from text import get_font, text_cache
 
 class Button:
     '''为游戏创建按钮的类'''
 
     def __init__(self, ai_game, msg):
         self.screen = ai_game.screen
-        self.screen_rect = self.screen.get_rect()
+        self.screen_rect = ai_game.screen_rect
 
         # 设置按钮的尺寸和其他属性
         self.width, self.height = 200, 50
         self.button_color = (0, 135, 0)
         self.text_color = (255, 255,255)
-        self.font = pygame.font.SysFont(None, 48)
+        self.font = get_font(None, 48)
 
         # 创建按钮的rect对象，并使其居中
         self.rect = pygame.Rect(0, 0, self.width, self.height)
@@ -21,13 +23,20 @@ class Button:
         self._prep_msg(msg)
 
     def _prep_msg(self, msg):
-        '''将msg渲染为图像，并使其在按钮上居中'''
-        self.msg_image = self.font.render(msg, True, self.text_color,
-                                          self.button_color)
+        '''将msg渲染为图像，并使其在按钮上居中（相同的文字和颜色共享缓存的图像）'''
+        self.msg_image = text_cache.render(self.font, msg, self.text_color,
+                                           self.button_color)
         self.msg_image_rect = self.msg_image.get_rect()
         self.msg_image_rect.center = self.rect.center
 
-    def draw_button(self):
-        '''绘制一个用颜色填充的按钮，再绘制文本'''
-        self.screen.fill(self.button_color, self.rect)
-        self.screen.blit(self.msg_image, self.msg_image_rect)
+    def draw_button(self, surface=None, offset=(0, 0)):
+        '''绘制一个用颜色填充的按钮，再绘制文本
+
+        surface默认为屏幕；绘制到其他图像上时用offset平移按钮位置
+        '''
+        if surface is None:
+            surface = self.screen
+        rect = self.rect.move(offset)
+        surface.fill(self.button_color, rect)
+        surface.blit(self.msg_image, self.msg_image_rect.move(offset))
+        return rect
@@ -0,0 +1,102 @@
+class SpatialHash:
+    '''把精灵按均匀网格分桶的空间哈希，只检测共享网格的候选对象'''
+
+    def __init__(self, cell_size=64, rect_attr='rect'):
+        '''初始化网格，rect_attr是精灵上用于分桶的矩形属性名'''
+        self.cell_size = cell_size
+        self.rect_attr = rect_attr
+        self.cells = {}
+
+    def _cell_keys(self, rect):
+        '''返回rect覆盖的所有网格坐标'''
+        size = self.cell_size
+        x0, y0 = rect.left // size, rect.top // size
+        x1, y1 = (rect.right - 1) // size, (rect.bottom - 1) // size
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield cx, cy
+
+    def clear(self):
+        '''清空所有网格'''
+        self.cells.clear()
+
+    def insert(self, sprite):
+        '''将精灵放入它覆盖的网格'''
+        cells = self.cells
+        for key in self._cell_keys(getattr(sprite, self.rect_attr)):
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [sprite]
+            else:
+                bucket.append(sprite)
+
+    def remove(self, sprite):
+        '''将精灵从它覆盖的网格中移除'''
+        for key in self._cell_keys(getattr(sprite, self.rect_attr)):
+            bucket = self.cells.get(key)
+            if bucket and sprite in bucket:
+                bucket.remove(sprite)
+
+    def rebuild(self, sprites):
+        '''根据精灵的当前位置重建网格'''
+        self.cells.clear()
+        for sprite in sprites:
+            self.insert(sprite)
+
+    def query(self, rect):
+        '''返回与rect的外接矩形真正重叠的候选精灵'''
+        cells = self.cells
+        attr = self.rect_attr
+        found = []
+        seen = set()
+        for key in self._cell_keys(rect):
+            for sprite in cells.get(key, ()):
+                if id(sprite) not in seen:
+                    seen.add(id(sprite))
+                    if rect.colliderect(getattr(sprite, attr)):
+                        found.append(sprite)
+        return found
+
+
+def masks_overlap(mask, rect, other_mask, other_rect):
+    '''mask放在rect处、other_mask放在other_rect处时，两者是否有重叠的像素'''
+    offset = (other_rect[0] - rect[0], other_rect[1] - rect[1])
+    return mask.overlap(other_mask, offset) is not None
+
+
+def groupcollide(group, grid, dokill, dokill_grid, offset=(0, 0), collided=None):
+    '''检测group与网格中精灵的碰撞，返回与pygame.sprite.groupcollide相同的字典
+
+    offset是网格坐标系原点在屏幕上的位置，group中精灵的rect先平移到网格坐标系再检测；
+    collided(rect, other)用于对外接矩形相交的候选做精确判断，rect是平移后的矩形
+    '''
+    dx, dy = -offset[0], -offset[1]
+    collisions = {}
+    for sprite in group.sprites():
+        rect = sprite.rect.move(dx, dy)
+        hits = grid.query(rect)
+        if hits and collided is not None:
+            hits = [other for other in hits if collided(rect, other)]
+        if not hits:
+            continue
+        if dokill_grid:
+            for other in hits:
+                grid.remove(other)
+                other.kill()
+        collisions[sprite] = hits
+    if dokill and collisions:
+        # 遍历结束后再移除，group可以直接返回内部列表而不必复制
+        group.remove(*collisions)
+    return collisions
+
+
+def spritecollideany(sprite, grid, offset=(0, 0), collided=None):
+    '''返回网格中与sprite相撞的任意一个精灵，没有则返回None
+
+    offset和collided的含义与groupcollide相同
+    '''
+    rect = sprite.rect.move(-offset[0], -offset[1])
+    for other in grid.query(rect):
+        if collided is None or collided(rect, other):
+            return other
+    return None
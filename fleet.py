@@ -0,0 +1,373 @@
+from pygame.sprite import Group
+
+from alien import Alien
+import collision
+from renderer import formation_commands
+
+try:
+    import numpy as np
+except ImportError:  # numpy是可选依赖
+    np = None
+
+
+class SpriteFleet(Group):
+    '''把舰队当作编队管理的精灵编组（默认后端）
+
+    外星人只记录相对编队原点的位置（alien.slot），移动和下降只修改原点；
+    存活外星人占据的最左、最右列和最低行随外星人被消灭增量维护，
+    因此边缘、下降和触底检查每帧都是常数时间
+    '''
+
+    def __init__(self, ai_game):
+        '''初始化舰队'''
+        super().__init__()
+        self.ai_game = ai_game
+        self.settings = ai_game.settings
+        self.screen_rect = ai_game.screen_rect
+        # 所有外星人共享同一张图像
+        self.image = ai_game.assets.image('images/alien.bmp')
+        self.mask = ai_game.assets.mask('images/alien.bmp')
+        self.width, self.height = self.image.get_size()
+        # 外接矩形相交后实际做过的像素掩码判断次数（累计）
+        self.narrow_checks = 0
+
+        # 编队原点在屏幕上的位置
+        self.origin_x = 0.0
+        self.origin_y = 0
+
+        # 碰撞检测用的空间哈希建立在编队坐标系中，编队移动时无需重建
+        self.grid = collision.SpatialHash(self.settings.collision_cell_size, 'slot')
+        self._layout_dirty = True
+
+        # 编队在最近一个tick里的位移，用于插值渲染
+        self.motion = (0.0, 0.0)
+        self._drop = 0
+
+    def spawn(self, x, y):
+        '''在指定的屏幕位置创建一个外星人'''
+        alien = Alien(self.ai_game)
+        alien.slot.topleft = (x - self.offset()[0], y - self.offset()[1])
+        self.add(alien)
+        self._layout_dirty = True
+
+    def empty(self):
+        '''清空舰队，原点回到屏幕左上角'''
+        super().empty()
+        self.origin_x = 0.0
+        self.origin_y = 0
+        self.grid.clear()
+        self._layout_dirty = True
+        self.settle()
+
+    def offset(self):
+        '''编队原点对应的整数像素位置'''
+        return round(self.origin_x), self.origin_y
+
+    def _ensure_layout(self):
+        '''编队成员变化后，重建空间哈希和每列、每行的存活计数'''
+        if not self._layout_dirty:
+            return
+        aliens = self.sprites()
+        self.grid.rebuild(aliens)
+
+        self._columns = {}
+        self._rows = {}
+        for alien in aliens:
+            self._columns[alien.slot.x] = self._columns.get(alien.slot.x, 0) + 1
+            self._rows[alien.slot.y] = self._rows.get(alien.slot.y, 0) + 1
+        self._column_keys = sorted(self._columns)
+        self._row_keys = sorted(self._rows)
+        self._left = 0
+        self._right = len(self._column_keys) - 1
+        self._bottom = len(self._row_keys) - 1
+        self._layout_dirty = False
+
+    def _forget(self, alien):
+        '''外星人被消灭后更新存活计数，并把两侧和底部的边界收缩到仍有外星人的列和行'''
+        self._columns[alien.slot.x] -= 1
+        self._rows[alien.slot.y] -= 1
+
+        columns, keys = self._columns, self._column_keys
+        while self._left <= self._right and not columns[keys[self._left]]:
+            self._left += 1
+        while self._right >= self._left and not columns[keys[self._right]]:
+            self._right -= 1
+        rows, keys = self._rows, self._row_keys
+        while self._bottom >= 0 and not rows[keys[self._bottom]]:
+            self._bottom -= 1
+
+    def update(self):
+        '''移动编队原点'''
+        dx = (self.settings.alien_speed * self.settings.tick_scale
+              * self.settings.fleet_direction)
+        self.origin_x += dx
+        self.motion = (dx, self._drop)
+        self._drop = 0
+
+    def settle(self):
+        '''舰队本tick没有移动，停止插值'''
+        self.motion = (0.0, 0.0)
+        self._drop = 0
+
+    def positions(self):
+        '''按创建顺序返回所有外星人的屏幕位置(x, y)'''
+        return [(alien.slot.x + self.origin_x, alien.slot.y + self.origin_y)
+                for alien in self.sprites()]
+
+    def write_positions(self, xs, ys):
+        '''把存活外星人的屏幕坐标依次写入预先分配的数组，返回写入的数量'''
+        ox, oy = self.origin_x, self.origin_y
+        limit = len(xs)
+        count = 0
+        for alien in self.sprites():
+            if count == limit:
+                break
+            xs[count] = alien.slot.x + ox
+            ys[count] = alien.slot.y + oy
+            count += 1
+        return count
+
+    def screen_positions(self):
+        '''返回所有外星人在当前tick绘制的整数屏幕位置，结果是不可变的元组'''
+        ox, oy = self.offset()
+        return tuple((alien.slot.x + ox, alien.slot.y + oy) for alien in self.sprites())
+
+    def draw(self, batch, alpha=1.0):
+        '''把按alpha插值的所有外星人加入绘制批次'''
+        batch.extend(formation_commands(
+            self.image, self.screen_positions(), self.motion, 1 - alpha))
+
+    def check_edges(self):
+        '''有外星人到达屏幕边缘时返回True'''
+        if not self:
+            return False
+        self._ensure_layout()
+        ox = self.offset()[0]
+        left = self._column_keys[self._left] + ox
+        right = self._column_keys[self._right] + ox + self.width
+        return right >= self.screen_rect.right or left <= 0
+
+    def drop(self, distance):
+        '''将整个舰队向下移动'''
+        self.origin_y += distance
+        self._drop += distance
+
+    def reached_bottom(self):
+        '''有外星人到达屏幕底端时返回True'''
+        if not self:
+            return False
+        self._ensure_layout()
+        bottom = self._row_keys[self._bottom] + self.origin_y + self.height
+        return bottom >= self.screen_rect.bottom
+
+    def _narrow_phase(self, mask):
+        '''返回用像素掩码精确判断候选外星人的函数，关闭像素碰撞时返回None'''
+        if not self.settings.pixel_collisions:
+            return None
+        alien_mask = self.mask
+
+        def collided(rect, alien):
+            self.narrow_checks += 1
+            return collision.masks_overlap(mask, rect, alien_mask, alien.slot)
+        return collided
+
+    def collide_ship(self, ship):
+        '''检查飞船是否与外星人相撞'''
+        self._ensure_layout()
+        return collision.spritecollideany(
+            ship, self.grid, self.offset(), self._narrow_phase(ship.mask)) is not None
+
+    def collide_bullets(self, bullets):
+        '''删除相撞的子弹和外星人，返回与groupcollide相同的字典'''
+        if not bullets:
+            return {}
+        self._ensure_layout()
+        collisions = collision.groupcollide(bullets, self.grid, True, True, self.offset(),
+                                            self._narrow_phase(bullets.mask))
+        for aliens in collisions.values():
+            for alien in aliens:
+                self._forget(alien)
+        return collisions
+
+
+class ArrayFleet:
+    '''用NumPy数组存储外星人位置和存活状态的舰队后端
+
+    与精灵后端相同，数组只记录外星人相对编队原点的整数位置，移动和下降只修改原点，
+    屏幕位置是编队位置加上取整后的原点，两个后端的每一个像素都相同
+    '''
+
+    def __init__(self, ai_game, capacity=64):
+        '''初始化数组和共享的外星人图像'''
+        self.settings = ai_game.settings
+        self.screen_rect = ai_game.screen_rect
+        self.image = ai_game.assets.image('images/alien.bmp')
+        self.mask = ai_game.assets.mask('images/alien.bmp')
+        self.width, self.height = self.image.get_size()
+        # 外接矩形相交后实际做过的像素掩码判断次数（累计）
+        self.narrow_checks = 0
+
+        # 外星人相对编队原点的位置
+        self.slot_x = np.zeros(capacity, dtype=np.int64)
+        self.slot_y = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.count = 0
+        self.living = 0
+
+        # 编队原点在屏幕上的位置
+        self.origin_x = 0.0
+        self.origin_y = 0
+
+        # 整个舰队在最近一个tick里的位移，用于插值渲染
+        self.motion = (0.0, 0.0)
+        self._drop = 0
+
+    def __len__(self):
+        return self.living
+
+    def __bool__(self):
+        return self.living > 0
+
+    def spawn(self, x, y):
+        '''在指定的屏幕位置创建一个外星人，容量不足时成倍扩容'''
+        if self.count == len(self.slot_x):
+            self._grow(2 * len(self.slot_x))
+        ox, oy = self.offset()
+        self.slot_x[self.count] = x - ox
+        self.slot_y[self.count] = y - oy
+        self.alive[self.count] = True
+        self.count += 1
+        self.living += 1
+
+    def _grow(self, capacity):
+        '''扩大数组容量'''
+        self.slot_x = np.resize(self.slot_x, capacity)
+        self.slot_y = np.resize(self.slot_y, capacity)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.count] = self.alive[:self.count]
+        self.alive = alive
+
+    def empty(self):
+        '''清空舰队，原点回到屏幕左上角'''
+        self.alive[:self.count] = False
+        self.count = 0
+        self.living = 0
+        self.origin_x = 0.0
+        self.origin_y = 0
+        self.settle()
+
+    def offset(self):
+        '''编队原点对应的整数像素位置'''
+        return round(self.origin_x), self.origin_y
+
+    def update(self):
+        '''移动编队原点'''
+        dx = (self.settings.alien_speed * self.settings.tick_scale
+              * self.settings.fleet_direction)
+        self.origin_x += dx
+        self.motion = (dx, self._drop)
+        self._drop = 0
+
+    def settle(self):
+        '''舰队本tick没有移动，停止插值'''
+        self.motion = (0.0, 0.0)
+        self._drop = 0
+
+    def _pixels(self):
+        '''返回所有外星人的整数像素坐标数组(xs, ys)
+
+        碰撞、边缘检查和绘制都使用这一种位置，只对原点取整一次，与精灵后端一致
+        '''
+        n = self.count
+        ox, oy = self.offset()
+        return self.slot_x[:n] + ox, self.slot_y[:n] + oy
+
+    def check_edges(self):
+        '''有外星人到达屏幕边缘时返回True'''
+        xs = self._pixels()[0][self.alive[:self.count]]
+        if not len(xs):
+            return False
+        return bool(xs.max() + self.width >= self.screen_rect.right
+                    or xs.min() <= 0)
+
+    def drop(self, distance):
+        '''将整个舰队向下移动'''
+        self.origin_y += distance
+        self._drop += distance
+
+    def reached_bottom(self):
+        '''有外星人到达屏幕底端时返回True'''
+        ys = self._pixels()[1][self.alive[:self.count]]
+        return bool(len(ys) and ys.max() + self.height >= self.screen_rect.bottom)
+
+    def _overlaps(self, rect, xs, ys):
+        '''返回位于(xs, ys)的存活外星人中与rect重叠的掩码'''
+        return (self.alive[:self.count]
+                & (xs < rect.right) & (xs + self.width > rect.left)
+                & (ys < rect.bottom) & (ys + self.height > rect.top))
+
+    def _mask_hits(self, mask, rect, hits, xs, ys):
+        '''在外接矩形相交的外星人下标hits中，保留与rect处的mask有像素重叠的'''
+        if not self.settings.pixel_collisions or not len(hits):
+            return hits
+        self.narrow_checks += len(hits)
+        alien_mask = self.mask
+        return hits[[collision.masks_overlap(mask, rect, alien_mask, (xs[i], ys[i]))
+                     for i in hits.tolist()]]
+
+    def collide_ship(self, ship):
+        '''检查飞船是否与外星人相撞'''
+        xs, ys = self._pixels()
+        hits = np.flatnonzero(self._overlaps(ship.rect, xs, ys))
+        return bool(len(self._mask_hits(ship.mask, ship.rect, hits, xs, ys)))
+
+    def collide_bullets(self, bullets):
+        '''删除相撞的子弹和外星人，返回{子弹: [外星人下标]}'''
+        collisions = {}
+        if not self.living:
+            return collisions
+        xs, ys = self._pixels()
+        for bullet in bullets.sprites():
+            hits = np.flatnonzero(self._overlaps(bullet.rect, xs, ys))
+            hits = self._mask_hits(bullets.mask, bullet.rect, hits, xs, ys)
+            if len(hits):
+                self.alive[hits] = False
+                self.living -= len(hits)
+                collisions[bullet] = hits.tolist()
+        if collisions:
+            bullets.remove(*collisions)
+        return collisions
+
+    def positions(self):
+        '''按创建顺序返回所有存活外星人的屏幕位置(x, y)'''
+        n = self.count
+        alive = self.alive[:n]
+        return np.column_stack((self.slot_x[:n][alive] + self.origin_x,
+                                self.slot_y[:n][alive] + self.origin_y)).tolist()
+
+    def write_positions(self, xs, ys):
+        '''把存活外星人的屏幕坐标依次写入预先分配的数组，返回写入的数量'''
+        n = self.count
+        alive = self.alive[:n]
+        count = min(self.living, len(xs))
+        xs[:count] = self.slot_x[:n][alive][:count] + self.origin_x
+        ys[:count] = self.slot_y[:n][alive][:count] + self.origin_y
+        return count
+
+    def screen_positions(self):
+        '''返回所有存活外星人在当前tick绘制的整数屏幕位置，结果是不可变的元组'''
+        alive = self.alive[:self.count]
+        xs, ys = self._pixels()
+        return tuple(zip(xs[alive].tolist(), ys[alive].tolist()))
+
+    def draw(self, batch, alpha=1.0):
+        '''按alpha插值，把所有存活的外星人从数组加入绘制批次'''
+        batch.extend(formation_commands(
+            self.image, self.screen_positions(), self.motion, 1 - alpha))
+
+
+def create_fleet(ai_game):
+    '''根据设置创建舰队后端，没有安装numpy时退回精灵后端'''
+    if ai_game.settings.fleet_backend == 'numpy' and np is not None:
+        return ArrayFleet(ai_game)
+    return SpriteFleet(ai_game)
@@ -1,5 +1,101 @@
 import json
+import os
+import stat
+import tempfile
+import threading
 from pathlib import Path
+from time import monotonic
+
+
+class HighScoreWriter:
+    '''在后台线程中防抖并原子地写入最高分文件'''
+
+    def __init__(self, path, delay):
+        self.path = Path(path)
+        self.delay = delay
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._deadline = 0.0
+        self._closed = False
+        self._thread = None
+
+        # 读取umask必须临时修改它，只在创建时（主线程）读一次，后台线程不再触碰
+        umask = os.umask(0)
+        os.umask(umask)
+        self._new_file_mode = 0o666 & ~umask
+
+    def schedule(self, scores):
+        '''记下最新的最高分，delay秒内没有新分数时由后台线程写入'''
+        with self._cond:
+            self._pending = dict(scores)
+            self._deadline = monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        '''后台线程：等待分数稳定下来再写入'''
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                while not self._closed:
+                    remaining = self._deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                scores, self._pending = self._pending, None
+            self._write(scores)
+
+    def flush(self):
+        '''立即写入尚未保存的分数'''
+        with self._cond:
+            scores, self._pending = self._pending, None
+        if scores is not None:
+            self._write(scores)
+
+    def close(self):
+        '''停止后台线程并保证最后一次写入'''
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _write(self, scores):
+        '''先写临时文件再重命名，崩溃时不会留下被截断的文件'''
+        with self._write_lock:
+            try:
+                fd, tmp = tempfile.mkstemp(dir=self.path.parent,
+                                           prefix='.high_scores', suffix='.tmp')
+            except OSError:
+                return
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(json.dumps(scores))
+                    f.flush()
+                    os.fsync(f.fileno())
+                # mkstemp创建的文件只有所有者可读写，替换前改成原文件（或新建文件）应有的权限
+                os.chmod(tmp, self._file_mode())
+                os.replace(tmp, self.path)
+            except OSError:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    def _file_mode(self):
+        '''返回目标文件的权限：已存在时沿用，否则按umask计算新建文件的权限'''
+        try:
+            return stat.S_IMODE(os.stat(self.path).st_mode)
+        except OSError:
+            return self._new_file_mode
 
 
 class GameStats:
@@ -9,6 +105,8 @@ class GameStats:
         self.reset_stats()
         self.high_scores = self._load_high_scores()
         self.high_score = self._get_current_high_score()
+        self.writer = HighScoreWriter('high_scores.json',
+                                      self.settings.high_score_flush_delay)
 
     def reset_stats(self):
         self.ships_left = self.settings.ship_limit
@@ -33,10 +131,16 @@ class GameStats:
         return self.high_scores.get(diff, 0)
 
     def save_high_scores(self):
-        try:
-            Path('high_scores.json').write_text(json.dumps(self.high_scores))
-        except:
-            pass
+        '''标记最高分需要保存，由后台线程稍后写入'''
+        if not self.settings.persist_high_scores:
+            return
+        self.writer.schedule(self.high_scores)
+
+    def close(self):
+        '''退出前把未保存的最高分写入文件'''
+        if self.settings.persist_high_scores:
+            self.save_high_scores()
+        self.writer.close()
 
     def check_high_score(self):
         current = self._get_current_high_score()
@@ -46,4 +150,4 @@ class GameStats:
             self.high_score = self.score
             self.save_high_scores()
             return True
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,98 @@
+from collections import deque
+
+
+class QualityGovernor:
+    '''根据最近的帧耗时自动升降画质档位
+
+    帧耗时持续超出预算时依次关闭可选的开销：帮助界面的半透明遮罩、降低HUD刷新频率、
+    背景音乐和渲染分辨率；有余量时再逐档恢复。降档只需一个评估窗口，升档需要连续多个，
+    两个阈值之间留有间隔，避免在两档之间来回切换
+    '''
+
+    # 档位从高到低排列；render_scale是相对于设置中渲染比例的倍数，
+    # 只在画面本来就要整屏提交时使用（见_can_rescale）
+    TIERS = (
+        {'name': '高', 'help_overlay_alpha': True, 'hud_interval': 1,
+         'background_music': True, 'render_scale': 1.0},
+        {'name': '中', 'help_overlay_alpha': False, 'hud_interval': 4,
+         'background_music': True, 'render_scale': 1.0},
+        {'name': '低', 'help_overlay_alpha': False, 'hud_interval': 10,
+         'background_music': False, 'render_scale': 0.75},
+        {'name': '最低', 'help_overlay_alpha': False, 'hud_interval': 15,
+         'background_music': False, 'render_scale': 0.5},
+    )
+
+    def __init__(self, ai_game):
+        '''初始化帧耗时窗口，从最高档开始'''
+        self.ai_game = ai_game
+        self.settings = ai_game.settings
+        self.base_scale = ai_game.settings.render_scale
+        self.tier = 0
+        self.samples = deque(maxlen=self.settings.quality_window)
+        self._calm_windows = 0
+
+    @property
+    def tier_name(self):
+        return self.TIERS[self.tier]['name']
+
+    def budget(self):
+        '''一帧的时间预算（秒）；不限帧率时以模拟频率为准'''
+        rate = self.settings.frame_rate or self.settings.tick_rate
+        return 1 / rate
+
+    def _can_rescale(self):
+        '''降低渲染分辨率是否真能省时间
+
+        窗口与模拟画面同尺寸且开启脏矩形时，缩放会把只提交变化区域变成每帧整屏缩放加flip，
+        实测渲染耗时反而翻倍；只有原本就要缩放或整屏提交时才降低分辨率
+        '''
+        ai = self.ai_game
+        scaled = (self.base_scale != 1.0
+                  or ai.window.get_size() != ai.screen_rect.size)
+        return scaled or not self.settings.dirty_rendering
+
+    def sample(self, frame_time):
+        '''记下一帧不含等待的耗时（秒），窗口填满后评估一次'''
+        samples = self.samples
+        samples.append(frame_time)
+        if len(samples) < samples.maxlen:
+            return
+        load = sorted(samples)[len(samples) * 9 // 10] / self.budget()
+        samples.clear()
+
+        if load > self.settings.quality_high_load:
+            self._calm_windows = 0
+            if self.tier < len(self.TIERS) - 1:
+                self.set_tier(self.tier + 1, load)
+        elif load < self.settings.quality_low_load:
+            self._calm_windows += 1
+            if (self._calm_windows >= self.settings.quality_upgrade_windows
+                    and self.tier > 0):
+                self._calm_windows = 0
+                self.set_tier(self.tier - 1, load)
+        else:
+            self._calm_windows = 0
+
+    def set_tier(self, tier, load=None):
+        '''切换到指定档位并应用对应的设置'''
+        self.tier = tier
+        spec = self.TIERS[tier]
+        ai = self.ai_game
+        settings = self.settings
+
+        settings.help_overlay_alpha = spec['help_overlay_alpha']
+        settings.hud_interval = spec['hud_interval']
+        if settings.background_music != spec['background_music']:
+            settings.background_music = spec['background_music']
+            if not settings.background_music:
+                ai.audio.stop_music()
+            elif ai.game_active:
+                ai.audio.play_music()
+        if self._can_rescale():
+            ai.set_render_scale(self.base_scale * spec['render_scale'])
+        ai.renderer.invalidate()
+
+        if load is None:
+            print(f'画质调整为 {spec["name"]}')
+        else:
+            print(f'画质调整为 {spec["name"]}（帧耗时p90为预算的 {load:.0%}）')
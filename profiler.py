@@ -0,0 +1,101 @@
+import json
+from time import perf_counter
+
+import pygame
+
+from text import get_font
+
+
+class FrameProfiler:
+    '''把主循环每帧的阶段耗时、精灵数量和帧率记录到固定大小的环形缓冲区'''
+
+    PHASES = ('events', 'simulate', 'render')
+
+    def __init__(self, capacity=600):
+        '''预先分配缓冲区，关闭时主循环不会调用这里的任何方法'''
+        self.enabled = False
+        self.show_overlay = False
+        self.capacity = capacity
+        self.frames = [None] * capacity
+        self.index = 0
+        self.count = 0
+
+        # 当前帧内Surface的分配次数，由各个渲染位置调用note_alloc累加
+        self.allocations = 0
+
+        self._origin = perf_counter()
+        self._panel = None
+        self._font = None
+
+    def toggle_overlay(self):
+        '''切换性能面板，面板打开时才记录数据'''
+        self.show_overlay = not self.show_overlay
+        self.enabled = self.show_overlay
+
+    def note_alloc(self, count=1):
+        '''记下一次Surface分配'''
+        self.allocations += count
+
+    def record(self, start, timings, aliens, bullets, fps, **counters):
+        '''写入一帧的数据，缓冲区满后覆盖最旧的一帧'''
+        self.frames[self.index] = (start, timings, aliens, bullets,
+                                   self.allocations, fps, counters)
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.allocations = 0
+
+    def recent(self):
+        '''按时间顺序返回缓冲区中的所有帧'''
+        if self.count < self.capacity:
+            return self.frames[:self.count]
+        return self.frames[self.index:] + self.frames[:self.index]
+
+    def export_chrome_trace(self, path):
+        '''把缓冲区导出为Chrome trace-event格式的JSON，可在chrome://tracing中查看'''
+        events = []
+        for start, timings, aliens, bullets, allocations, fps, counters in self.recent():
+            ts = (start - self._origin) * 1e6
+            for name, duration in zip(self.PHASES, timings):
+                events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': ts, 'dur': duration * 1e6})
+                ts += duration * 1e6
+            args = {'aliens': aliens, 'bullets': bullets,
+                    'allocations': allocations, 'fps': fps}
+            args.update(counters)
+            for name, value in args.items():
+                events.append({'name': name, 'ph': 'C', 'pid': 1,
+                               'ts': (start - self._origin) * 1e6,
+                               'args': {name: value}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def draw_overlay(self, surface, budget):
+        '''在左下角绘制帧耗时曲线，budget是一帧的预算（秒），返回绘制区域'''
+        if self._panel is None:
+            self._panel = pygame.Surface((self.capacity // 2, 120))
+            self._panel.set_alpha(210)
+            self._font = get_font(None, 20)
+        panel = self._panel
+        width, height = panel.get_size()
+        panel.fill((20, 20, 20))
+
+        # 预算线位于面板一半高度处
+        scale = (height - 20) / (2 * budget)
+        budget_y = height - budget * scale
+        pygame.draw.line(panel, (200, 60, 60), (0, budget_y), (width, budget_y))
+
+        frames = self.recent()[-width:]
+        if len(frames) > 1:
+            points = [(x, max(20, height - sum(frame[1]) * scale))
+                      for x, frame in enumerate(frames)]
+            pygame.draw.lines(panel, (80, 220, 80), False, points)
+
+            _, timings, aliens, bullets, allocations, fps, counters = frames[-1]
+            text = (f'{sum(timings) * 1000:.1f}ms  fps {fps:.0f}  '
+                    f'aliens {aliens}  bullets {bullets}  alloc {allocations}')
+            for name, value in counters.items():
+                text += f'  {name} {value}'
+            panel.blit(self._font.render(text, True, (230, 230, 230)), (4, 4))
+
+        rect = panel.get_rect(bottomleft=surface.get_rect().bottomleft)
+        return surface.blit(panel, rect)
@@ -0,0 +1,226 @@
+import pygame
+
+
+# 以下函数把位置和插值偏移转换为绘制命令，实时渲染和快照渲染共用同一套取整规则。
+# t = 1 - alpha，是当前时刻距离最近一个tick还差的比例；偏移都是上一个tick相对当前的位移
+
+def bullet_commands(image, bullets, t):
+    '''bullets是(x, y, dy)的序列，返回插值后的绘制命令'''
+    return [(image, (x, y + round(dy * t))) for x, y, dy in bullets]
+
+
+def ship_command(image, ship, t):
+    '''ship是(x, y, dx)，返回插值后的一条绘制命令'''
+    x, y, dx = ship
+    return image, (x + round(dx * t), y)
+
+
+def formation_commands(image, positions, motion, t):
+    '''positions是外星人当前tick的整数位置，motion是整个舰队本tick的位移(dx, dy)'''
+    ox = round(-motion[0] * t)
+    oy = round(-motion[1] * t)
+    return [(image, (x + ox, y + oy)) for x, y in positions]
+
+
+class DirtyRectTracker:
+    '''记录每帧绘制过的区域，只擦除并提交发生变化的部分'''
+
+    def __init__(self, screen, settings, display=True, scaled=False):
+        '''初始化脏矩形记录
+
+        display为False时screen是离屏图像，不提交到窗口；
+        scaled为True时screen是内部帧缓冲，每帧放大到整个窗口，只能整屏提交
+        '''
+        self.screen = screen
+        self.settings = settings
+        self.enabled = settings.dirty_rendering
+        self.display = display
+        self.scaled = scaled
+
+        # 上一帧绘制过的区域，下一帧要先用背景色擦除
+        self.previous = []
+        self.needs_redraw = True
+
+    def invalidate(self):
+        '''要求下一帧整屏重绘'''
+        self.needs_redraw = True
+
+    def is_idle(self):
+        '''画面静止且没有重绘请求时返回True，此时可以跳过整帧'''
+        return self.enabled and not self.needs_redraw
+
+    def begin(self):
+        '''开始新的一帧：整屏填充背景，或者只擦除上一帧的区域，返回填充调用次数'''
+        if (not self.enabled or self.needs_redraw
+                or len(self.previous) > self.settings.dirty_rect_limit):
+            self.screen.fill(self.settings.bg_color)
+            return 1
+        bg_color = self.settings.bg_color
+        for rect in self.previous:
+            self.screen.fill(bg_color, rect)
+        return len(self.previous)
+
+    def present(self, rects):
+        '''把本帧画面提交到窗口，rects是本帧绘制过的所有区域'''
+        rects = [rect for rect in rects if rect]
+        if not self.display:
+            # 离屏渲染时画面已经在图像上，不需要提交
+            pass
+        elif (not self.enabled or self.needs_redraw or self.scaled
+                or len(rects) > self.settings.dirty_rect_limit):
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous + rects)
+        self.previous = rects
+        self.needs_redraw = False
+
+
+class RenderBatch:
+    '''收集一帧内的所有绘制命令，最后用一次Surface.blits提交，并统计绘制调用次数
+
+    pygame-ce提供的fblits不返回绘制区域，但开销更小；所有命令都不带area参数时
+    使用fblits，绘制区域由命令本身算出。
+    命令总是使用模拟坐标；scale不为1时，提交前把坐标和图像缩放到target的分辨率，
+    缩放后的图像按原图缓存，所以原图内容改变后要调用forget()
+    '''
+
+    # 缩放缓存的最大数量，超过时整体清空
+    SCALED_LIMIT = 512
+
+    def __init__(self, target, scale=1.0, smooth=False):
+        '''target是所有命令绘制的目标Surface，scale是它相对于模拟坐标系的比例'''
+        self.target = target
+        self.scale = scale
+        self.smooth = smooth
+        self.commands = []
+        self._has_area = False
+        self._fblits = getattr(target, 'fblits', None)
+        self._scaled = {}
+
+        # 本帧提交到SDL的绘制调用次数和绘制的图像数
+        self.draw_calls = 0
+        self.images = 0
+
+    def begin(self):
+        '''开始新的一帧，清空命令和计数'''
+        self.commands.clear()
+        self._has_area = False
+        self.draw_calls = 0
+        self.images = 0
+
+    def add(self, image, dest, area=None):
+        '''加入一条绘制命令'''
+        if area is None:
+            self.commands.append((image, dest))
+        else:
+            self.commands.append((image, dest, area))
+            self._has_area = True
+
+    def extend(self, commands):
+        '''加入多条(image, dest)命令'''
+        self.commands.extend(commands)
+
+    def forget(self, image):
+        '''image的内容改变后调用，丢弃它的缩放缓存'''
+        self._scaled.pop(image, None)
+
+    def _scaled_image(self, image):
+        '''返回按scale缩放并缓存的图像'''
+        scaled = self._scaled.get(image)
+        if scaled is None:
+            if len(self._scaled) >= self.SCALED_LIMIT:
+                self._scaled.clear()
+            width, height = image.get_size()
+            size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+            # smoothscale只支持24位和32位图像
+            if self.smooth and image.get_bitsize() >= 24:
+                scaled = pygame.transform.smoothscale(image, size)
+            else:
+                scaled = pygame.transform.scale(image, size)
+            self._scaled[image] = scaled
+        return scaled
+
+    def _scale_commands(self, commands):
+        '''把模拟坐标系中的命令换算到target的分辨率'''
+        scale = self.scale
+        scaled_image = self._scaled_image
+        scaled = []
+        for command in commands:
+            image, dest = command[0], command[1]
+            dest = (round(dest[0] * scale), round(dest[1] * scale))
+            if len(command) == 2:
+                scaled.append((scaled_image(image), dest))
+            else:
+                area = command[2]
+                scaled.append((scaled_image(image), dest, pygame.Rect(
+                    round(area[0] * scale), round(area[1] * scale),
+                    round(area[2] * scale), round(area[3] * scale))))
+        return scaled
+
+    def note(self, calls=1):
+        '''记下绕过批处理的绘制调用，如擦除背景和调试面板'''
+        self.draw_calls += calls
+
+    def flush(self):
+        '''按加入的顺序提交所有命令，返回绘制过的区域'''
+        commands = self.commands
+        if not commands:
+            return []
+        self.commands = []
+        self.draw_calls += 1
+        self.images += len(commands)
+        if self.scale != 1:
+            commands = self._scale_commands(commands)
+        if self._fblits is None or self._has_area:
+            self._has_area = False
+            return self.target.blits(commands)
+
+        self._fblits(commands)
+        clip = self.target.get_clip()
+        return [clip.clip(image.get_rect(topleft=(dest[0], dest[1])))
+                for image, dest in commands]
+
+
+class FrameScaler:
+    '''把内部帧缓冲按模拟画面的宽高比放大到窗口中央，两侧留黑边，
+    并把窗口坐标换算回模拟坐标
+    '''
+
+    def __init__(self, window, framebuffer, sim_size, smooth=False):
+        '''计算画面在窗口中的位置，sim_size是模拟坐标系的尺寸'''
+        self.window = window
+        self.framebuffer = framebuffer
+        self.sim_size = sim_size
+        self._scale = pygame.transform.smoothscale if smooth else pygame.transform.scale
+
+        window_rect = window.get_rect()
+        factor = min(window_rect.width / sim_size[0], window_rect.height / sim_size[1])
+        self.viewport = pygame.Rect(0, 0, round(sim_size[0] * factor),
+                                    round(sim_size[1] * factor))
+        self.viewport.center = window_rect.center
+        self._target = window.subsurface(self.viewport)
+
+        # 画面四周的黑边
+        viewport = self.viewport
+        borders = [
+            pygame.Rect(0, 0, window_rect.width, viewport.top),
+            pygame.Rect(0, viewport.bottom, window_rect.width,
+                        window_rect.height - viewport.bottom),
+            pygame.Rect(0, viewport.top, viewport.left, viewport.height),
+            pygame.Rect(viewport.right, viewport.top,
+                        window_rect.width - viewport.right, viewport.height),
+        ]
+        self.borders = [rect for rect in borders if rect.width and rect.height]
+
+    def present(self):
+        '''把帧缓冲放大到窗口，返回画面所在的区域'''
+        for rect in self.borders:
+            self.window.fill((0, 0, 0), rect)
+        self._scale(self.framebuffer, self.viewport.size, self._target)
+        return self.viewport
+
+    def to_sim(self, pos):
+        '''把窗口坐标换算为模拟坐标'''
+        viewport = self.viewport
+        return (int((pos[0] - viewport.x) * self.sim_size[0] / viewport.width),
+                int((pos[1] - viewport.y) * self.sim_size[1] / viewport.height))
@@ -0,0 +1,191 @@
+'''录制每个tick的输入和状态哈希，并在无头模式下快速回放
+
+录制：python alien_invasion.py --record recordings
+回放：python replay.py recordings/session-20260101-120000-000.airp --frames 100 2000
+'''
+import argparse
+import struct
+import sys
+import zlib
+from pathlib import Path
+from itertools import count
+from time import localtime, perf_counter, strftime, time
+
+# 每个tick的输入用一个字节的位掩码表示
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_FIRE = 4
+ACTION_NAMES = (('left', ACTION_LEFT), ('right', ACTION_RIGHT), ('fire', ACTION_FIRE))
+
+DIFFICULTIES = ('easy', 'normal', 'hard')
+STATES = ('menu', 'playing', 'respawning', 'level_clear', 'game_over')
+
+# 文件头：魔数、版本、难度、哈希间隔、tick频率、随机种子；其后是zlib压缩的tick记录
+MAGIC = b'AIRP'
+# 模拟规则变化导致旧录像无法重现时递增（2：像素碰撞）
+VERSION = 2
+HEADER = struct.Struct('<4sBBBHI')
+HASH = struct.Struct('<I')
+# 每隔这么多tick同步刷新一次压缩流，进程崩溃或被杀时最多丢失这么多tick
+SYNC_INTERVAL = 60
+
+
+def encode_actions(actions):
+    '''把'left'、'right'、'fire'组成的集合编码为位掩码'''
+    bits = 0
+    for name, bit in ACTION_NAMES:
+        if name in actions:
+            bits |= bit
+    return bits
+
+
+def decode_actions(bits):
+    '''把位掩码解码为动作名称的元组'''
+    return tuple(name for name, bit in ACTION_NAMES if bits & bit)
+
+
+def state_hash(ai_game):
+    '''把影响模拟的状态打包后计算crc32，用于发现回放分歧'''
+    stats = ai_game.stats
+    crc = zlib.crc32(struct.pack(
+        '<dqqqdBb', ai_game.ship.x, stats.score, stats.ships_left, stats.level,
+        ai_game.state_timer, STATES.index(ai_game.state),
+        ai_game.settings.fleet_direction))
+    bullets = [bullet.y for bullet in ai_game.bullets.sprites()]
+    crc = zlib.crc32(struct.pack(f'<{len(bullets)}d', *bullets), crc)
+    aliens = [value for position in ai_game.aliens.positions() for value in position]
+    return zlib.crc32(struct.pack(f'<{len(aliens)}d', *aliens), crc)
+
+
+class SessionRecorder:
+    '''把一局游戏的输入和状态哈希写入紧凑的二进制文件'''
+
+    def __init__(self, path, difficulty, seed, tick_rate, hash_interval=1):
+        self.path = Path(path)
+        self.hash_interval = hash_interval
+        self.tick = 0
+
+        # 'xb'：文件已存在时报错，绝不覆盖已有的录像
+        self.file = open(self.path, 'xb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, DIFFICULTIES.index(difficulty),
+                                    hash_interval, tick_rate, seed))
+        self._compressor = zlib.compressobj()
+
+    @classmethod
+    def in_directory(cls, directory, *args, **kwargs):
+        '''在directory中按开始时间（精确到毫秒）命名一个新的录像文件，重名时追加序号'''
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        now = time()
+        stamp = f"session-{strftime('%Y%m%d-%H%M%S', localtime(now))}-{int(now * 1000) % 1000:03d}"
+        for index in count():
+            suffix = f'-{index}' if index else ''
+            try:
+                return cls(directory / f'{stamp}{suffix}.airp', *args, **kwargs)
+            except FileExistsError:
+                continue
+
+    def record(self, actions, ai_game):
+        '''记录一个tick的输入，每hash_interval个tick附带一次状态哈希'''
+        chunk = bytes((actions,))
+        if self.tick % self.hash_interval == 0:
+            chunk += HASH.pack(state_hash(ai_game))
+        self.file.write(self._compressor.compress(chunk))
+        self.tick += 1
+        if self.tick % SYNC_INTERVAL == 0:
+            # 同步刷新后，已写入的部分即使没有正常结束也能单独解压
+            self.file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+            self.file.flush()
+
+    def close(self):
+        '''写完压缩数据并关闭文件'''
+        if not self.file.closed:
+            self.file.write(self._compressor.flush())
+            self.file.close()
+
+
+def read_session(path):
+    '''读取录像，返回(文件头字典, [(输入位掩码, 状态哈希或None), ...])
+
+    没有正常结束的录像（游戏崩溃或被杀）读到最后一个完整的tick为止
+    '''
+    data = Path(path).read_bytes()
+    magic, version, difficulty, hash_interval, tick_rate, seed = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} 不是可识别的录像文件')
+    header = {
+        'difficulty': DIFFICULTIES[difficulty],
+        'hash_interval': hash_interval,
+        'tick_rate': tick_rate,
+        'seed': seed,
+    }
+
+    # 流式解压，截断的压缩流只返回能解出的部分而不报错
+    body = zlib.decompressobj().decompress(data[HEADER.size:])
+    ticks = []
+    offset = 0
+    while offset < len(body):
+        expected = None
+        if len(ticks) % hash_interval == 0:
+            if offset + 1 + HASH.size > len(body):
+                break
+            expected, = HASH.unpack_from(body, offset + 1)
+        ticks.append((body[offset], expected))
+        offset += 1 if expected is None else 1 + HASH.size
+    return header, ticks
+
+
+def replay(path, frames=(), out_dir='replay_frames'):
+    '''无头回放录像并逐tick核对状态哈希，返回第一个分歧的tick（没有分歧时为None）'''
+    import pygame
+
+    from alien_invasion import AlienInvasion
+
+    header, ticks = read_session(path)
+    ai = AlienInvasion(headless=True)
+    ai.settings.set_tick_rate(header['tick_rate'])
+    ai.settings.seed = header['seed']
+    ai.reset(header['difficulty'])
+
+    frames = set(frames)
+    if frames:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    for tick, (actions, expected) in enumerate(ticks):
+        ai.step(decode_actions(actions))
+        if expected is not None and state_hash(ai) != expected:
+            return tick
+        if tick in frames:
+            # 中间的帧都没有渲染，保存前整屏重绘
+            ai.renderer.invalidate()
+            ai._update_screen()
+            pygame.image.save(ai.screen, str(Path(out_dir) / f'frame-{tick:06d}.png'))
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='无头回放外星人入侵录像')
+    parser.add_argument('path', help='录像文件')
+    parser.add_argument('--frames', type=int, nargs='*', default=[],
+                        help='需要渲染并保存为PNG的tick编号')
+    parser.add_argument('--out', default='replay_frames', help='PNG的输出目录')
+    args = parser.parse_args(argv)
+
+    header, ticks = read_session(args.path)
+    start = perf_counter()
+    diverged = replay(args.path, args.frames, args.out)
+    elapsed = perf_counter() - start
+
+    game_seconds = len(ticks) / header['tick_rate']
+    print(f"{len(ticks)} 个tick（游戏时间 {game_seconds:.1f} 秒），回放用时 {elapsed:.2f} 秒，"
+          f"{game_seconds / max(elapsed, 1e-9):.0f} 倍速")
+    if diverged is not None:
+        print(f'状态在第 {diverged} 个tick出现分歧')
+        return 1
+    print('状态哈希全部一致')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
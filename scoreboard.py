@@ -1,22 +1,47 @@
-import pygame.font
-from pygame.sprite import Group
+import pygame
 
-from ship import Ship
+from assets import to_display_format
+from text import GlyphAtlas, get_font, text_cache
 
 class Scoreboard:
-    '''显示得分信息的类'''
+    '''显示得分信息的类
+
+    得分、最高分和等级合成到一张缓存的HUD图像上，只在数值变化后的下一帧重画变化的行；
+    余下的飞船共享同一个图标
+    '''
+
+    # HUD图像中相邻两行之间的间隔
+    ROW_GAP = 4
 
     def __init__(self, ai_game):
         '''初始化显示得分涉及的属性'''
         self.ai_game = ai_game
         self.screen = ai_game.screen
-        self.screen_rect = self.screen.get_rect()
+        self.screen_rect = ai_game.screen_rect
         self.settings = ai_game.settings
         self.stats = ai_game.stats
+        self.profiler = ai_game.profiler
 
         # 显示得分信息时使用的字体设置
         self.text_color = (30, 30, 30)
-        self.font = pygame.font.SysFont(None, 48)
+        self.font = get_font(None, 48)
+        # 数字由预先渲染的字形拼接，得分变化时不必重新渲染整行文字
+        self.digits = GlyphAtlas(self.font, self.text_color, self.settings.bg_color)
+
+        # 所有剩余飞船共享一个图标
+        self.ship_icon = ai_game.assets.image('images/ship.bmp')
+        self.ship_positions = []
+
+        # HUD图像每行存放一项文字，hud_texts记录各行当前的内容
+        self.hud_image = None
+        self.hud_texts = []
+        self.hud_blits = []
+        self._dirty = True
+        # 从快照绘制时最近一次收到的数值和对应的飞船图标位置
+        self._hud = None
+        self._hud_ships = []
+        # 距离上次合成HUD经过的帧数，配合settings.hud_interval限制合成频率
+        self._frames = 0
 
         # 准备包含最高分和当前得分的图像
         self.prep_score()
@@ -24,36 +49,21 @@ class Scoreboard:
         self.prep_level()
         self.prep_ships()
 
+    def _label(self, text):
+        '''返回缓存的标签文字图像'''
+        return text_cache.render(self.font, text, self.text_color, self.settings.bg_color)
+
     def prep_score(self):
-        '''将得分渲染为图像'''
-        rounded_score = round(self.stats.score, -1)
-        score_str = f'Score: {rounded_score:,}'
-        self.score_image = self.font.render(score_str, True,
-                                            self.text_color, self.settings.bg_color)
-
-        # 在屏幕右上角显示得分
-        self.score_rect = self.score_image.get_rect()
-        self.score_rect.right = self.screen_rect.right - 20
-        self.score_rect.top = 20
-
-    def show_score(self):
-        '''在屏幕上绘制得分、等级和余下的飞船数'''
-        self.screen.blit(self.score_image, self.score_rect)
-        self.screen.blit(self.high_score_image, self.high_score_rect)
-        self.screen.blit(self.level_image, self.level_rect)
-        self.ships.draw(self.screen)
+        '''得分变化后调用，HUD在下一次绘制时重新合成'''
+        self._dirty = True
 
     def prep_high_score(self):
-        '''将最高分渲染为图像'''
-        high_score = round(self.stats.high_score, -1)
-        high_score_str = f'High Score: {high_score:,}'
-        self.high_score_image = self.font.render(high_score_str, True,
-                                                 self.text_color,self.settings.bg_color)
+        '''最高分变化后调用，HUD在下一次绘制时重新合成'''
+        self._dirty = True
 
-        # 将最高分放在屏幕顶部的中央
-        self.high_score_rect = self.high_score_image.get_rect()
-        self.high_score_rect.centerx = self.screen_rect.centerx
-        self.high_score_rect.top = self.score_rect.top
+    def prep_level(self):
+        '''等级变化后调用，HUD在下一次绘制时重新合成'''
+        self._dirty = True
 
     def check_high_score(self):
         '''检查是否诞生了新的最高分'''
@@ -62,21 +72,84 @@ class Scoreboard:
             self.prep_high_score()
 
     def prep_ships(self):
-        '''显示还余下多少艘飞船'''
-        self.ships = Group()
-        for ship_number in range(self.stats.ships_left):
-            ship = Ship(self.ai_game)
-            ship.rect.x = 10 + ship_number * ship.rect.width
-            ship.rect.y = 10
-            self.ships.add(ship)
+        '''计算余下飞船图标的位置'''
+        self.ship_positions = self._ship_positions(self.stats.ships_left)
 
-    def prep_level(self):
-        '''将等级渲染为图像'''
-        level_str = f'Level: {self.stats.level}'
-        self.level_image = self.font.render(level_str, True,
-                                            self.text_color, self.settings.bg_color)
-
-        # 将等级放在得分下方
-        self.level_rect = self.level_image.get_rect()
-        self.level_rect.right = self.score_rect.right
-        self.level_rect.top = self.score_rect.bottom + 10
+    def _ship_positions(self, ships_left):
+        '''返回ships_left个飞船图标的位置'''
+        width = self.ship_icon.get_width()
+        return [(10 + ship_number * width, 10) for ship_number in range(ships_left)]
+
+    def _layout(self, score, high_score, level):
+        '''返回各项的(标签图像, 数字文字, 屏幕位置)'''
+        items = [
+            (self._label('Score: '), f'{round(score, -1):,}'),
+            (self._label('High Score: '), f'{round(high_score, -1):,}'),
+            (self._label('Level: '), str(level)),
+        ]
+        rects = [pygame.Rect(0, 0, label.get_width() + self.digits.size(text)[0],
+                             max(label.get_height(), self.digits.height))
+                 for label, text in items]
+        score_rect, high_score_rect, level_rect = rects
+
+        # 得分在右上角，最高分在顶部中央，等级在得分下方
+        score_rect.right = self.screen_rect.right - 20
+        score_rect.top = 20
+        high_score_rect.centerx = self.screen_rect.centerx
+        high_score_rect.top = score_rect.top
+        level_rect.right = score_rect.right
+        level_rect.top = score_rect.bottom + 10
+        return [(label, text, rect) for (label, text), rect in zip(items, rects)]
+
+    def _compose(self, score, high_score, level):
+        '''把得分、最高分和等级逐行合成到HUD图像上，只重画文字变化的行'''
+        layout = self._layout(score, high_score, level)
+        width = max(rect.width for _, _, rect in layout)
+        # 行与行之间留出背景色的间隔，按比例缩放HUD时相邻行的像素不会混进来
+        pitch = max(rect.height for _, _, rect in layout) + self.ROW_GAP
+        if (self.hud_image is None or self.hud_image.get_width() < width
+                or self.hud_image.get_height() < pitch * len(layout)):
+            # 多留一些宽度，得分增加位数时不必重新分配
+            self.hud_image = to_display_format(
+                pygame.Surface((width + 64, pitch * len(layout))))
+            self.hud_image.fill(self.settings.bg_color)
+            self.hud_texts = [None] * len(layout)
+            self.profiler.note_alloc()
+
+        image = self.hud_image
+        self.hud_blits = []
+        for row, (label, text, rect) in enumerate(layout):
+            area = pygame.Rect(0, row * pitch, rect.width, rect.height)
+            if self.hud_texts[row] != (label, text):
+                image.fill(self.settings.bg_color,
+                           (0, area.y, image.get_width(), area.height))
+                image.blit(label, area)
+                self.digits.blit(image, text, (label.get_width(), area.y))
+                self.hud_texts[row] = (label, text)
+            self.hud_blits.append((image, rect, area))
+        self._dirty = False
+
+    def show_score(self, batch, hud=None):
+        '''把得分、等级和余下的飞船数加入绘制批次
+
+        hud是快照中的(得分, 最高分, 等级, 余下的飞船数)；为None时直接读取游戏统计
+        '''
+        self._frames += 1
+        if hud is None:
+            score, high_score, level = self.stats.score, self.stats.high_score, self.stats.level
+            positions = self.ship_positions
+        else:
+            if hud != self._hud:
+                self._hud = hud
+                self._hud_ships = self._ship_positions(hud[3])
+                self._dirty = True
+            score, high_score, level, _ = hud
+            positions = self._hud_ships
+        if self._dirty and (self.hud_image is None
+                            or self._frames >= self.settings.hud_interval):
+            self._compose(score, high_score, level)
+            batch.forget(self.hud_image)
+            self._frames = 0
+        icon = self.ship_icon
+        batch.extend(self.hud_blits)
+        batch.extend([(icon, position) for position in positions])
@@ -4,6 +4,45 @@ class Settings:
         self.screen_width = 1200
         self.screen_height = 800
         self.bg_color = (230, 230, 230)
+        self.language = 'zh'  # 游戏说明的语言：'zh'或'en'
+        # 屏幕尺寸是模拟坐标系的大小；render_scale小于1时先画到较小的内部帧缓冲，
+        # 每帧再放大到窗口（smooth_scaling为True时用平滑缩放，更清晰但更慢）
+        self.render_scale = 1.0
+        self.smooth_scaling = False
+        # 全屏时使用显示器的原生分辨率，按模拟画面的宽高比在两侧留黑边
+        self.fullscreen = False
+        # 帮助界面是否用半透明遮罩；HUD最多每几帧重新合成一次
+        self.help_overlay_alpha = True
+        self.hud_interval = 1
+
+        # 画质自动调节：每quality_window帧评估一次帧耗时的p90，
+        # 超过预算的quality_high_load倍就降一档；连续quality_upgrade_windows次
+        # 低于quality_low_load倍才升一档，避免来回切换
+        self.adaptive_quality = True
+        self.quality_window = 60
+        self.quality_high_load = 0.9
+        self.quality_low_load = 0.5
+        self.quality_upgrade_windows = 3
+
+        # 渲染设置：只重绘和提交变化的区域；单帧区域过多时退回整屏提交
+        self.dirty_rendering = True
+        self.dirty_rect_limit = 400
+
+        # 模拟以固定频率推进，渲染帧率独立（0表示不限制帧率）
+        self.set_tick_rate(60)
+        self.frame_rate = 60
+        # 单帧最多补算的时间（秒），防止卡顿后模拟追赶不上
+        self.max_frame_time = 0.25
+        # 为True时模拟在单独的线程中推进，主线程只处理事件并渲染最新的状态快照
+        self.threaded_simulation = False
+
+        # 随机种子，None表示每局随机选择（录像会记下实际使用的种子）
+        self.seed = None
+
+        # 状态切换时的停顿（秒）
+        self.respawn_delay = 0.5
+        self.level_clear_delay = 1.0
+        self.game_over_delay = 2.0
 
         # 飞船设置
         self.ship_limit = 3
@@ -16,12 +55,28 @@ class Settings:
 
         # 外星人设置
         self.fleet_drop_speed = 5
+        # 舰队后端：'sprite'为默认精灵编组，'numpy'为数组后端（需安装numpy）
+        self.fleet_backend = 'sprite'
+        # 碰撞检测空间哈希的网格边长（像素）
+        self.collision_cell_size = 64
+        # 外接矩形相交后再按像素掩码精确判断，图像透明的角落不算命中
+        self.pixel_collisions = True
 
         # 音量设置
         self.shoot_volume = 0.3
         self.explosion_volume = 0.5
         self.background_volume = 0.2
         self.sound_enabled = True
+        self.background_music = True
+        # 每种音效保留的混音通道数、同时发声的上限和抢占优先级（数值越大越优先）
+        self.sound_channels = {'shoot': 3, 'explosion': 4}
+        self.max_voices = 6
+        self.sound_priorities = {'shoot': 1, 'explosion': 2}
+
+        # 是否把最高分写入high_scores.json（无头模式下关闭）
+        self.persist_high_scores = True
+        # 最高分在这么多秒内没有再变化时才写入磁盘
+        self.high_score_flush_delay = 2.0
 
         # 速度提升系数
         self.speedup_scale = 1.2
@@ -31,6 +86,14 @@ class Settings:
         self.initialize_dynamic_settings()
         self.set_difficulty('normal')
 
+    def set_tick_rate(self, tick_rate):
+        '''设置每秒模拟的tick数
+
+        速度都以每秒60个tick为基准，tick_scale把它们换算成当前频率下每个tick的位移
+        '''
+        self.tick_rate = tick_rate
+        self.tick_scale = 60 / tick_rate
+
     def initialize_dynamic_settings(self):
         '''初始化动态设置'''
         self.ship_speed = 3.0      # 提高基础速度
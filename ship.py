@@ -1,6 +1,7 @@
-import pygame
 from pygame.sprite import Sprite
 
+from renderer import ship_command
+
 class Ship(Sprite):
     '''管理飞船的类'''
 
@@ -9,17 +10,20 @@ class Ship(Sprite):
         super().__init__()
         self.screen = ai_game.screen
         self.settings = ai_game.settings
-        self.screen_rect = ai_game.screen.get_rect()
+        self.screen_rect = ai_game.screen_rect
 
-        #加载飞船图像并获取其外接矩形
-        self.image = pygame.image.load('images/ship.bmp')
+        #从共享资源缓存获取飞船图像并获取其外接矩形
+        self.image = ai_game.assets.image('images/ship.bmp')
         self.rect = self.image.get_rect()
+        # 像素碰撞用的掩码，与图像一样来自共享资源缓存
+        self.mask = ai_game.assets.mask('images/ship.bmp')
 
         # 每艘新飞船都放在屏幕底部的中央
         self.rect.midbottom = self.screen_rect.midbottom
 
-        # 在飞船的属性x中存储一个浮点数
+        # 在飞船的属性x中存储一个浮点数，prev_x是上一个tick的位置，用于插值渲染
         self.x = float(self.rect.x)
+        self.prev_x = self.x
 
         # 移动标志（飞船一开始不移动）
         self.moving_right = False
@@ -28,19 +32,26 @@ class Ship(Sprite):
     def update(self):
         '''根据移动标志调整飞船的位置'''
         # 更行飞船而不是rect对象的x值
+        self.prev_x = self.x
+        speed = self.settings.ship_speed * self.settings.tick_scale
         if self.moving_right and self.rect.right < self.screen_rect.right:
-            self.x += self.settings.ship_speed
+            self.x += speed
         if self.moving_left and self.rect.left > 0:
-            self.x -= self.settings.ship_speed
+            self.x -= speed
 
         # 根据self.x更新rect对象
         self.rect.x = self.x
 
-    def blitme(self):
-        '''在指定位置绘制飞船'''
-        self.screen.blit(self.image, self.rect)
+    def snapshot(self):
+        '''返回(x, y, dx)：当前的整数位置和上一个tick相对当前的水平偏移'''
+        return self.rect.x, self.rect.y, self.prev_x - self.x
+
+    def blitme(self, batch, alpha=1.0):
+        '''把飞船加入绘制批次，位置在上一个tick和当前tick之间按alpha插值'''
+        batch.add(*ship_command(self.image, self.snapshot(), 1 - alpha))
 
     def center_ship(self):
         '''将飞船放在屏幕底部的中央'''
         self.rect.midbottom = self.screen_rect.midbottom
-        self.x = float(self.rect.x)
\ No newline at end of file
+        self.x = float(self.rect.x)
+        self.prev_x = self.x
\ No newline at end of file
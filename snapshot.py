@@ -0,0 +1,60 @@
+'''模拟线程发布给渲染线程的不可变状态快照'''
+import threading
+from collections import namedtuple
+from time import perf_counter
+
+# 快照只包含绘制一帧所需的数据，全部是元组和数字，发布后任何线程都不会再修改它
+Snapshot = namedtuple('Snapshot', (
+    'time',         # 发布时刻（perf_counter），渲染时据此计算插值位置
+    'tick',         # 模拟线程已推进的tick数
+    'game_active',
+    'state',
+    'state_timer',
+    'ship',         # (x, y, dx)：飞船的整数位置和上一个tick相对当前的水平偏移
+    'bullets',      # ((x, y, dy), ...)：子弹的整数位置和上一个tick相对当前的垂直偏移
+    'aliens',       # ((x, y), ...)：外星人的整数位置
+    'fleet_motion',  # 舰队在最近一个tick里的位移(dx, dy)
+    'hud',          # (得分, 最高分, 等级, 余下的飞船数)
+))
+
+
+def take_snapshot(ai_game, tick=0):
+    '''从当前的模拟状态生成快照，调用方需要持有模拟锁'''
+    ship = ai_game.ship
+    stats = ai_game.stats
+    return Snapshot(
+        perf_counter(), tick, ai_game.game_active, ai_game.state, ai_game.state_timer,
+        ship.snapshot(),
+        ai_game.bullets.snapshot(),
+        ai_game.aliens.screen_positions(),
+        ai_game.aliens.motion,
+        (stats.score, stats.high_score, stats.level, stats.ships_left),
+    )
+
+
+class SnapshotBuffer:
+    '''在模拟线程和渲染线程之间传递快照的双缓冲
+
+    模拟线程把新快照写入后台槽位，再在锁内交换前后台；渲染线程总是读前台槽位，
+    拿到的快照不可变，渲染期间模拟线程发布新快照也不会影响它
+    '''
+
+    def __init__(self):
+        '''初始化两个空槽位'''
+        self._slots = [None, None]
+        self._front = 0
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, snapshot):
+        '''写入后台槽位并交换前后台'''
+        back = 1 - self._front
+        self._slots[back] = snapshot
+        with self._lock:
+            self._front = back
+            self.published += 1
+
+    def latest(self):
+        '''返回最近发布的快照，尚未发布时返回None'''
+        with self._lock:
+            return self._slots[self._front]
@@ -0,0 +1,125 @@
+'''把两个舰队后端的碰撞结果与pygame.sprite的逐对检测（含collide_mask）比较'''
+import random
+
+import pygame
+import pytest
+
+from alien_invasion import AlienInvasion
+from assets import AssetCache
+from fleet import create_fleet, np
+
+TRIALS = 300
+
+BACKENDS = ['sprite', pytest.param('numpy', marks=pytest.mark.skipif(
+    np is None, reason='numpy未安装'))]
+
+
+def make_game(backend, pixel_collisions):
+    '''创建指定舰队后端的离屏游戏'''
+    ai = AlienInvasion(offscreen=True)
+    ai.settings.fleet_backend = backend
+    ai.settings.pixel_collisions = pixel_collisions
+    ai.aliens = create_fleet(ai)
+    return ai
+
+
+def scatter(ai, rng):
+    '''开始新的一局，把舰队移到随机的亚像素位置，并在舰队范围内随机发射子弹'''
+    ai.reset('normal')
+    ai.settings.alien_speed = rng.uniform(0, 40)
+    ai.settings.fleet_direction = rng.choice((1, -1))
+    ai.aliens.update()
+    ai.aliens.drop(rng.randrange(5))
+    ai.bullets.empty()
+    for _ in range(rng.randrange(1, 30)):
+        ai.bullets.fire((rng.randrange(1200), rng.randrange(600)))
+    ai.ship.rect.topleft = (rng.randrange(1140), rng.randrange(650))
+
+
+def sprite(image, rect, mask):
+    '''创建只用于pygame碰撞检测的精灵'''
+    result = pygame.sprite.Sprite()
+    result.image = image
+    result.rect = rect
+    result.mask = mask
+    return result
+
+
+def alien_groups(ai):
+    '''按舰队绘制的位置创建外星人精灵编组'''
+    fleet = ai.aliens
+    return pygame.sprite.Group(
+        sprite(fleet.image, fleet.image.get_rect(topleft=position), fleet.mask)
+        for position in fleet.screen_positions())
+
+
+def alien_position(fleet, alien):
+    '''返回碰撞结果中一个外星人（精灵或数组下标）的屏幕位置'''
+    ox, oy = fleet.offset()
+    if isinstance(alien, int):
+        return int(fleet.slot_x[alien]) + ox, int(fleet.slot_y[alien]) + oy
+    return alien.slot.x + ox, alien.slot.y + oy
+
+
+@pytest.mark.parametrize('pixel_collisions', [False, True])
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_matches_pygame_sprite_collisions(backend, pixel_collisions):
+    ai = make_game(backend, pixel_collisions)
+    collided = pygame.sprite.collide_mask if pixel_collisions else None
+    rng = random.Random(0)
+    hits = 0
+    for _ in range(TRIALS):
+        scatter(ai, rng)
+        aliens = alien_groups(ai)
+
+        ship = sprite(ai.ship.image, ai.ship.rect.copy(), ai.ship.mask)
+        expected_ship = pygame.sprite.spritecollideany(ship, aliens, collided) is not None
+        assert ai.aliens.collide_ship(ai.ship) == expected_ship
+
+        # pygame按子弹顺序逐个检测并立即删除被击中的外星人，与舰队的语义相同
+        bullets = pygame.sprite.Group()
+        for bullet in ai.bullets.sprites():
+            stand_in = sprite(None, bullet.rect.copy(), ai.bullets.mask)
+            stand_in.bullet = bullet
+            bullets.add(stand_in)
+        expected = {stand_in.bullet: {alien.rect.topleft for alien in found}
+                    for stand_in, found in pygame.sprite.groupcollide(
+                        bullets, aliens, True, True, collided).items()}
+
+        fleet = ai.aliens
+        actual = {bullet: {alien_position(fleet, alien) for alien in found}
+                  for bullet, found in fleet.collide_bullets(ai.bullets).items()}
+        assert actual == expected
+        assert sorted(fleet.screen_positions()) == sorted(
+            alien.rect.topleft for alien in aliens)
+        assert len(ai.bullets) == len(bullets)
+        hits += len(actual)
+    # 随机位置要真正覆盖到命中的情况
+    assert hits > TRIALS
+
+
+def test_masks_are_built_once_and_shared():
+    ai = make_game('sprite', True)
+    ai.reset('normal')
+    mask = ai.assets.mask('images/alien.bmp')
+    assert mask is ai.aliens.mask
+    assert all(alien.mask is mask for alien in ai.aliens.sprites())
+    assert ai.ship.mask is ai.assets.mask('images/ship.bmp')
+
+    # 不透明的位图以左上角的颜色作为背景，与设置colorkey后生成的掩码相同
+    image = ai.assets.image('images/alien.bmp').copy()
+    image.set_colorkey(image.get_at((0, 0)))
+    expected = pygame.mask.from_surface(image)
+    assert mask.count() == expected.count() == mask.overlap_area(expected, (0, 0))
+    assert 0 < mask.count() < image.get_width() * image.get_height()
+
+
+def test_mask_miss_does_not_count_as_image_hit():
+    cache = AssetCache()
+    cache.image('images/ship.bmp')
+    before = cache.stats()
+    cache.mask('images/ship.bmp')
+    after = cache.stats()
+    assert after['hits'] == before['hits']
+    assert after['misses'] == before['misses'] + 1
+    assert after['loads'] == before['loads']
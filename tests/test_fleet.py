@@ -0,0 +1,49 @@
+'''两个舰队后端在整局游戏中必须逐tick给出相同的状态和画面'''
+import pygame
+import pytest
+
+from alien_invasion import AlienInvasion
+from fleet import create_fleet, np
+from replay import state_hash
+
+pytestmark = pytest.mark.skipif(np is None, reason='numpy未安装')
+
+TICKS = 2000
+
+
+def make_game(backend):
+    '''创建指定舰队后端的离屏游戏'''
+    ai = AlienInvasion(offscreen=True)
+    ai.settings.fleet_backend = backend
+    ai.aliens = create_fleet(ai)
+    return ai
+
+
+def actions(tick):
+    '''左右往返并间歇开火的固定输入'''
+    moves = ('right',) if (tick // 90) % 2 else ('left',)
+    return moves + ('fire',) if tick % 5 == 0 else moves
+
+
+@pytest.mark.parametrize('difficulty', ['easy', 'normal', 'hard'])
+def test_backends_match_tick_by_tick(difficulty):
+    games = [make_game('sprite'), make_game('numpy')]
+    for ai in games:
+        ai.reset(difficulty)
+
+    for tick in range(TICKS):
+        alive = [ai.step(actions(tick)) for ai in games]
+        sprite, array = games
+        assert alive[0] == alive[1], tick
+        assert sprite.aliens.screen_positions() == array.aliens.screen_positions(), tick
+        assert state_hash(sprite) == state_hash(array), tick
+        if tick % 25 == 0:
+            # 插值到两个tick之间的画面也必须逐像素相同
+            for alpha in (1.0, 0.5, 0.3):
+                frames = []
+                for ai in games:
+                    ai._update_screen(alpha)
+                    frames.append(pygame.image.tobytes(ai.screen, 'RGB'))
+                assert frames[0] == frames[1], (tick, alpha)
+        if not alive[0]:
+            break
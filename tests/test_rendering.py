@@ -0,0 +1,56 @@
+'''只重绘变化区域的帧、从快照渲染的帧都必须与整屏实时渲染的帧逐像素相同'''
+import pygame
+import pytest
+
+from alien_invasion import AlienInvasion
+from fleet import create_fleet, np
+from snapshot import take_snapshot
+
+TICKS = 3000
+
+
+def play(dirty):
+    '''按固定输入玩一局，返回菜单、每隔50个tick和结束时的画面'''
+    ai = AlienInvasion(headless=True, audio=False)
+    ai.settings.dirty_rendering = dirty
+    ai.renderer.enabled = dirty
+    ai._update_screen()
+    frames = [pygame.image.tobytes(ai.screen, 'RGB')]
+    ai.reset('hard')
+    for tick in range(TICKS):
+        actions = {'right'} if (tick // 120) % 2 else {'left'}
+        if tick % 7 == 0:
+            actions.add('fire')
+        ai.step(actions)
+        ai._update_screen()
+        if tick % 50 == 0 or not ai.game_active:
+            frames.append(pygame.image.tobytes(ai.screen, 'RGB'))
+        if not ai.game_active:
+            break
+    return frames
+
+
+def test_dirty_frames_match_full_redraw():
+    dirty = play(True)
+    full = play(False)
+    assert len(dirty) == len(full)
+    mismatched = [index for index, (a, b) in enumerate(zip(dirty, full)) if a != b]
+    assert mismatched == []
+
+
+@pytest.mark.parametrize('backend', ['sprite', pytest.param('numpy', marks=pytest.mark.skipif(
+    np is None, reason='numpy未安装'))])
+def test_snapshot_frames_match_live_frames(backend):
+    ai = AlienInvasion(offscreen=True)
+    ai.settings.fleet_backend = backend
+    ai.aliens = create_fleet(ai)
+    ai.reset('normal')
+    for tick in range(600):
+        ai.step(('fire', 'left') if (tick // 60) % 2 else ('fire', 'right'))
+        if tick % 20:
+            continue
+        for alpha in (1.0, 0.5, 0.2):
+            ai._update_screen(alpha)
+            live = pygame.image.tobytes(ai.screen, 'RGB')
+            ai._render_snapshot(take_snapshot(ai), alpha)
+            assert pygame.image.tobytes(ai.screen, 'RGB') == live, (tick, alpha)
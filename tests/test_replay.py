@@ -0,0 +1,95 @@
+'''录制的一局游戏必须能逐tick重现，篡改过的录像必须报告分歧'''
+import random
+import zlib
+
+from alien_invasion import AlienInvasion
+import replay as replay_module
+from replay import (HASH, HEADER, SYNC_INTERVAL, SessionRecorder, read_session,
+                    replay)
+
+TICKS = 3000
+
+
+def record(directory):
+    '''用随机输入录制一局游戏，返回录像文件的路径'''
+    ai = AlienInvasion(headless=True, audio=False, record_dir=directory)
+    ai.settings.seed = 1234
+    ai.reset('hard')
+    rng = random.Random(0)
+    for _ in range(TICKS):
+        actions = rng.choice(((), ('left',), ('right',), ('fire',),
+                              ('left', 'fire'), ('right', 'fire')))
+        if not ai.step(actions):
+            break
+    ai._stop_recording()
+    path, = directory.iterdir()
+    return path
+
+
+def test_replay_reproduces_recording(tmp_path):
+    path = record(tmp_path / 'recordings')
+    header, ticks = read_session(path)
+    assert header['seed'] == 1234
+    assert len(ticks) > 100
+    assert replay(path) is None
+
+
+def test_replay_reports_divergence(tmp_path):
+    path = record(tmp_path / 'recordings')
+    data = path.read_bytes()
+    _, ticks = read_session(path)
+
+    # 从某个tick起把每个输入换成与原来不同的移动方向，状态哈希保持原样
+    changed = len(ticks) // 2
+    body = bytearray(zlib.decompress(data[HEADER.size:]))
+    offset = 0
+    for tick, (actions, expected) in enumerate(ticks):
+        if tick >= changed:
+            body[offset] = 2 if actions != 2 else 1
+        offset += 1 + (HASH.size if expected is not None else 0)
+    tampered = tmp_path / 'tampered.airp'
+    tampered.write_bytes(data[:HEADER.size] + zlib.compress(bytes(body)))
+
+    diverged = replay(tampered)
+    assert diverged is not None and diverged >= changed
+
+
+def test_sessions_started_together_are_all_kept(tmp_path):
+    directory = tmp_path / 'recordings'
+    ai = AlienInvasion(headless=True, audio=False, record_dir=directory)
+    for _ in range(3):
+        ai.reset('normal')
+        for _ in range(10):
+            ai.step(('fire',))
+    ai._stop_recording()
+    paths = sorted(directory.iterdir())
+    assert len(paths) == 3
+    assert all(len(read_session(path)[1]) == 10 for path in paths)
+
+
+def test_same_millisecond_gets_a_new_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay_module, 'time', lambda: 1_800_000_000.5)
+    recorders = [SessionRecorder.in_directory(tmp_path, 'normal', 0, 60) for _ in range(3)]
+    for recorder in recorders:
+        recorder.close()
+    assert len({recorder.path for recorder in recorders}) == 3
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+def test_unfinished_recording_is_readable(tmp_path):
+    ai = AlienInvasion(headless=True, audio=False, record_dir=tmp_path)
+    ai.settings.seed = 1234
+    ai.reset('normal')
+    for tick in range(2000):
+        ai.step(('left', 'fire') if tick % 3 else ('right',))
+    # 模拟进程被杀：不调用close()，磁盘上只有同步刷新过的部分
+    path = ai.recorder.path
+    data = path.read_bytes()
+    ai._stop_recording()
+
+    crashed = tmp_path / 'crashed.airp'
+    for size in (len(data), len(data) - 3):
+        crashed.write_bytes(data[:size])
+        _, ticks = read_session(crashed)
+        assert 2000 - SYNC_INTERVAL <= len(ticks) <= 2000
+        assert replay(crashed) is None
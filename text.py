@@ -0,0 +1,133 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+from assets import to_display_format
+
+# 字体文件的扩展名，其他名称按系统字体查找
+FONT_FILE_TYPES = ('.ttf', '.ttc', '.otf', '.fon')
+
+_fonts = {}
+
+
+def get_font(face=None, size=48):
+    '''返回进程内共享的字体对象，同一(face, size)只创建一次
+
+    face为None时使用pygame自带的默认字体，不会扫描系统字体；
+    face是字体文件路径时直接加载，否则按系统字体名称查找
+    '''
+    key = (face, size)
+    font = _fonts.get(key)
+    if font is None:
+        if face is None or os.path.splitext(face)[1].lower() in FONT_FILE_TYPES:
+            font = pygame.font.Font(face, size)
+        else:
+            font = pygame.font.SysFont(face, size)
+        _fonts[key] = font
+    return font
+
+
+class TextCache:
+    '''按(文字, 字体, 颜色)缓存渲染好的文字图像，超出容量时淘汰最久未用的'''
+
+    def __init__(self, capacity=256):
+        '''初始化缓存，on_miss在每次真正渲染时调用，可用于统计Surface分配'''
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.on_miss = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, background=None, antialias=True):
+        '''返回共享的文字图像，调用方不能修改它'''
+        key = (text, font, antialias, color, background)
+        surfaces = self.surfaces
+        image = surfaces.get(key)
+        if image is not None:
+            self.hits += 1
+            surfaces.move_to_end(key)
+            return image
+
+        self.misses += 1
+        image = font.render(text, antialias, color, background)
+        # 缓存的图像会反复绘制，转换为显示格式后blit更快
+        image = to_display_format(image, alpha=background is None)
+        surfaces[key] = image
+        if len(surfaces) > self.capacity:
+            surfaces.popitem(last=False)
+        if self.on_miss is not None:
+            self.on_miss()
+        return image
+
+    def clear(self):
+        '''清空缓存'''
+        self.surfaces.clear()
+
+    def stats(self):
+        '''返回命中统计'''
+        return {'hits': self.hits, 'misses': self.misses,
+                'surfaces': len(self.surfaces)}
+
+
+# 进程内共享的文字缓存
+text_cache = TextCache()
+
+
+class GlyphAtlas:
+    '''把单个字符预先渲染成字形，数字等频繁变化的文字由缓存的字形拼接而成'''
+
+    def __init__(self, font, color, background, chars='0123456789,'):
+        '''预先渲染chars中的字符，其他字符首次出现时再渲染'''
+        self.font = font
+        self.color = color
+        self.background = background
+        self.height = font.get_height()
+        self.glyphs = {}
+        self.widths = {}
+        for char in chars:
+            self._glyph(char)
+
+    def _glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            # 转换为显示格式，拼接时不必逐次转换像素格式
+            glyph = to_display_format(
+                self.font.render(char, True, self.color, self.background))
+            self.glyphs[char] = glyph
+            self.widths[char] = glyph.get_width()
+        return glyph
+
+    def size(self, text):
+        '''返回拼接text所需的尺寸'''
+        widths = self.widths
+        return sum(widths[char] if char in widths else self._glyph(char).get_width()
+                   for char in text), self.height
+
+    def blit(self, surface, text, dest):
+        '''用一次blits把text的字形依次绘制到surface的dest处，返回绘制区域'''
+        x, y = dest
+        glyphs = self.glyphs
+        sequence = []
+        for char in text:
+            glyph = glyphs.get(char) or self._glyph(char)
+            sequence.append((glyph, (x, y)))
+            x += glyph.get_width()
+        surface.blits(sequence, False)
+        return pygame.Rect(dest, (x - dest[0], self.height))
+
+    def render(self, text, prefix=None):
+        '''把可选的前缀图像和text的字形拼成一张新图像'''
+        width, height = self.size(text)
+        if prefix is not None:
+            width += prefix.get_width()
+            height = max(height, prefix.get_height())
+        image = pygame.Surface((width, height))
+        image.fill(self.background)
+        x = 0
+        if prefix is not None:
+            image.blit(prefix, (0, 0))
+            x = prefix.get_width()
+        self.blit(image, text, (x, 0))
+        return image
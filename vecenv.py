@@ -0,0 +1,184 @@
+'''在一个进程内同步推进多个游戏实例，输入和输出都是预先分配的NumPy数组
+
+示例：
+    env = VecEnv(8, difficulty='normal', pixels=True)
+    obs = env.reset()
+    obs, rewards, dones = env.step(np.full(8, ACTION_FIRE))
+    frame = env.frames[0]   # 第0个实例的画面，(高, 宽, 3)，与渲染共享内存
+'''
+import argparse
+import sys
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+from alien_invasion import AlienInvasion
+from replay import ACTION_FIRE, ACTION_LEFT, ACTION_RIGHT, DIFFICULTIES, STATES
+from settings import Settings
+
+# 观测向量开头的标量字段，其后依次是外星人x、外星人y、子弹x、子弹y，不足的部分填0
+HEADER_FIELDS = ('ship_x', 'ships_left', 'level', 'state', 'fleet_direction',
+                 'aliens', 'bullets')
+
+
+class VecEnv:
+    '''同步推进num_envs个离屏游戏实例
+
+    step()每次都把观测、奖励和结束标志写入同一组数组并返回它们，调用方需要保留时自行复制；
+    结束的实例会立即开始新的一局，当步的观测已经是新一局的初始状态
+    '''
+
+    def __init__(self, num_envs, difficulty='normal', pixels=False, frame_skip=1):
+        '''创建num_envs个实例
+
+        pixels为True时每个实例直接渲染到共享NumPy内存的图像上，frames[i]是第i个实例的画面视图；
+        frame_skip是每次step()推进的tick数，期间重复同一个动作
+        '''
+        self.num_envs = num_envs
+        self.difficulty = difficulty
+        self.frame_skip = frame_skip
+
+        self.pixel_buffer = None
+        self.frames = None
+        if pixels:
+            settings = Settings()
+            width, height = settings.screen_width, settings.screen_height
+            self.pixel_buffer = np.zeros((num_envs, height, width, 4), dtype=np.uint8)
+            self.frames = self.pixel_buffer[..., :3]
+
+        self.games = []
+        for index in range(num_envs):
+            surface = None
+            if pixels:
+                # 图像直接使用缓冲区的内存，渲染结果就是观测，不需要复制或加锁
+                surface = pygame.image.frombuffer(
+                    self.pixel_buffer[index], (width, height), 'RGBX')
+            self.games.append(AlienInvasion(offscreen=True, surface=surface))
+
+        # 一整屏最多能容纳的外星人数和同时存在的子弹数决定了观测的长度
+        game = self.games[0]
+        game.reset(difficulty)
+        self.max_aliens = len(game.aliens)
+        self.max_bullets = game.settings.bullet_allowed
+
+        header = len(HEADER_FIELDS)
+        self._alien_x = slice(header, header + self.max_aliens)
+        self._alien_y = slice(self._alien_x.stop, self._alien_x.stop + self.max_aliens)
+        self._bullet_x = slice(self._alien_y.stop, self._alien_y.stop + self.max_bullets)
+        self._bullet_y = slice(self._bullet_x.stop, self._bullet_x.stop + self.max_bullets)
+        self.obs_size = self._bullet_y.stop
+
+        self.observations = np.zeros((num_envs, self.obs_size), dtype=np.float32)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self._scores = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self):
+        '''所有实例开始新的一局，返回观测数组'''
+        for index, game in enumerate(self.games):
+            game.reset(self.difficulty)
+            self._scores[index] = 0
+            self._observe(index, game)
+        self.rewards.fill(0)
+        self.dones.fill(False)
+        if self.frames is not None:
+            self.render()
+        return self.observations
+
+    def step(self, actions):
+        '''每个实例按actions中对应的位掩码推进frame_skip个tick
+
+        返回(观测, 奖励, 结束标志)；奖励是这一步的得分增量
+        '''
+        rewards = self.rewards
+        dones = self.dones
+        for index, (game, action) in enumerate(zip(self.games, np.asarray(actions).tolist())):
+            for _ in range(self.frame_skip):
+                if not game.step(action) or game.state == 'game_over':
+                    break
+            score = game.stats.score
+            rewards[index] = score - self._scores[index]
+            self._scores[index] = score
+
+            done = not game.game_active or game.state == 'game_over'
+            dones[index] = done
+            if done:
+                game.reset(self.difficulty)
+                self._scores[index] = 0
+            self._observe(index, game)
+
+        if self.frames is not None:
+            self.render()
+        return self.observations, rewards, dones
+
+    def _observe(self, index, game):
+        '''把一个实例的状态写入观测数组的第index行'''
+        row = self.observations[index]
+        stats = game.stats
+        row[0] = game.ship.x
+        row[1] = stats.ships_left
+        row[2] = stats.level
+        row[3] = STATES.index(game.state)
+        row[4] = game.settings.fleet_direction
+
+        xs, ys = row[self._alien_x], row[self._alien_y]
+        aliens = game.aliens.write_positions(xs, ys)
+        xs[aliens:] = 0
+        ys[aliens:] = 0
+        row[5] = aliens
+
+        xs, ys = row[self._bullet_x], row[self._bullet_y]
+        bullets = 0
+        for bullet in game.bullets.sprites():
+            if bullets == self.max_bullets:
+                break
+            xs[bullets] = bullet.rect.x
+            ys[bullets] = bullet.y
+            bullets += 1
+        xs[bullets:] = 0
+        ys[bullets:] = 0
+        row[6] = bullets
+
+    def render(self):
+        '''把每个实例的当前画面渲染到frames中'''
+        for game in self.games:
+            game._update_screen()
+
+    def close(self):
+        '''释放所有实例'''
+        for game in self.games:
+            game._stop_recording()
+        self.games.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='测量多实例同步推进的吞吐量')
+    parser.add_argument('--envs', type=int, default=16, help='同时推进的实例数')
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--difficulty', default='normal', choices=DIFFICULTIES)
+    parser.add_argument('--pixels', action='store_true', help='每步同时渲染像素观测')
+    parser.add_argument('--seed', type=int, default=0, help='随机动作的种子')
+    args = parser.parse_args(argv)
+
+    env = VecEnv(args.envs, args.difficulty, pixels=args.pixels)
+    rng = np.random.default_rng(args.seed)
+    choices = np.array([0, ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE,
+                        ACTION_LEFT | ACTION_FIRE, ACTION_RIGHT | ACTION_FIRE])
+    env.reset()
+    episodes = 0
+    start = perf_counter()
+    for _ in range(args.steps):
+        _, _, dones = env.step(rng.choice(choices, args.envs))
+        episodes += int(dones.sum())
+    elapsed = perf_counter() - start
+
+    steps = args.steps * args.envs
+    print(f'{args.envs} 个实例 × {args.steps} 步，用时 {elapsed:.2f} 秒，'
+          f'{steps / elapsed:.0f} 步/秒，结束 {episodes} 局')
+    env.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())